@@ -18,9 +18,10 @@ class EnergyManagementAgent:
         """Analyze energy consumption patterns and provide optimization strategies"""
         try:
             # Get current energy and operational data
-            site_status = await self.mara_client.get_site_status()
-            prices = await self.mara_client.get_current_prices()
-            inventory = await self.mara_client.get_inventory()
+            snapshot = await self.mara_client.get_snapshot()
+            site_status = snapshot.site_status
+            prices = snapshot.prices
+            inventory = snapshot.inventory
             
             system_prompt = """You are an energy management specialist for large-scale cryptocurrency mining and AI compute operations.
             Analyze energy consumption patterns, costs, and efficiency to provide strategies for optimizing energy usage,
@@ -120,7 +121,7 @@ class EnergyManagementAgent:
         """Get specific energy optimization recommendations"""
         try:
             site_status = await self.mara_client.get_site_status()
-            prices = await self.mara_client.get_current_prices()
+            prices = await self.mara_client.get_recent_prices(1)
             
             current_energy_price = prices[0].get('energy_price', 0) if prices else 0
             total_power = site_status.get('total_power_used', 0)
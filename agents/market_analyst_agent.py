@@ -74,7 +74,7 @@ class MarketAnalystAgent:
     async def get_price_forecast(self, timeframe: str = "24h") -> Dict[str, Any]:
         """Generate price forecasts for different timeframes"""
         try:
-            prices = await self.mara_client.get_current_prices()
+            prices = await self.mara_client.get_recent_prices(10)
             btc_data = await self.btc_client.get_btc_data()
             
             system_prompt = """You are a quantitative analyst specializing in price forecasting for cryptocurrency and compute markets.
@@ -18,9 +18,10 @@ class PerformanceOptimizerAgent:
         """Analyze current performance and provide optimization recommendations"""
         try:
             # Get current performance data
-            site_status = await self.mara_client.get_site_status()
-            prices = await self.mara_client.get_current_prices()
-            inventory = await self.mara_client.get_inventory()
+            snapshot = await self.mara_client.get_snapshot()
+            site_status = snapshot.site_status
+            prices = snapshot.prices
+            inventory = snapshot.inventory
             
             system_prompt = """You are a performance optimization specialist for cryptocurrency mining and AI compute operations.
             Analyze system performance metrics and provide specific recommendations to maximize efficiency, 
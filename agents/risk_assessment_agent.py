@@ -1,4 +1,5 @@
 from typing import Dict, Any, Optional, List
+import asyncio
 import json
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -20,9 +21,12 @@ class RiskAssessmentAgent:
         """Assess operational risks for the mining and compute operation"""
         try:
             # Get current operational data
-            site_status = await self.mara_client.get_site_status()
-            prices = await self.mara_client.get_current_prices()
-            btc_data = await self.btc_client.get_btc_data()
+            snapshot, btc_data = await asyncio.gather(
+                self.mara_client.get_snapshot(parts=("site_status", "prices")),
+                self.btc_client.get_btc_data()
+            )
+            site_status = snapshot.site_status
+            prices = snapshot.prices
             
             system_prompt = """You are a risk management specialist for cryptocurrency mining and AI compute operations.
             Assess operational, financial, and market risks to provide actionable risk mitigation strategies.
@@ -96,7 +100,7 @@ class RiskAssessmentAgent:
         """Calculate quantitative risk metrics"""
         try:
             site_status = await self.mara_client.get_site_status()
-            prices = await self.mara_client.get_current_prices()
+            prices = await self.mara_client.get_recent_prices(2)
             
             # Calculate basic risk metrics
             total_revenue = site_status.get('total_revenue', 0)
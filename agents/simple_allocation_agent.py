@@ -1,13 +1,23 @@
 from typing import Dict, Any, Optional, List
+import asyncio
 import json
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from utils.mara_client import MaraClient
+from utils.inventory import ALLOCATION_KEYS
+from utils.allocation_optimizer import (
+    AllocationConstraints,
+    AllocationOptimizer,
+    OptimizationResult,
+    RatioConstraint,
+    DEFAULT_POWER_LIMIT,
+)
 
 class SimpleAllocationAgent:
-    def __init__(self, anthropic_api_key: str, mara_client: MaraClient):
+    def __init__(self, anthropic_api_key: str, mara_client: MaraClient, narrative_timeout: float = 8.0):
         self.mara_client = mara_client
+        self.narrative_timeout = narrative_timeout
         self.llm = ChatAnthropic(
             model="claude-3-5-sonnet-20241022",
             api_key=anthropic_api_key,
@@ -17,82 +27,74 @@ class SimpleAllocationAgent:
     async def optimize_allocation(
         self, 
         target_revenue: Optional[float] = None,
-        inference_priority: float = 0.7,  # Default to 70%
-        power_limit: Optional[int] = None
+        inference_priority: float = 0.7,  # Minimum share of used power going to inference
+        power_limit: Optional[int] = None,
+        min_counts: Optional[Dict[str, int]] = None,
+        max_counts: Optional[Dict[str, int]] = None,
+        ratios: Optional[List[Dict[str, Any]]] = None,
+        reserved_headroom: int = 0,
+        narrate: bool = False
     ) -> Dict[str, Any]:
-        """Main entry point for allocation optimization"""
+        """Main entry point for allocation optimization.
         
-        try:
-            # Step 1: Fetch market data
-            current_prices = await self.mara_client.get_current_prices()
-            inventory = await self.mara_client.get_inventory()
-            site_status = await self.mara_client.get_site_status()
-            
-            # Step 2: Analyze market conditions
-            analysis = await self._analyze_market_conditions(
-                current_prices, inventory, site_status, inference_priority
-            )
-            
-            # Step 3: Generate optimal allocation
-            allocation_result = await self._generate_allocation(
-                analysis, current_prices, inventory, site_status,
-                target_revenue, inference_priority, power_limit
-            )
-            
-            # Step 4: Validate and calculate metrics
-            allocation = allocation_result["allocation"]
-            reasoning = allocation_result["reasoning"]
-            
-            # Validate power constraints
-            power_usage = self.mara_client.calculate_power_usage(allocation, inventory)
-            actual_power_limit = power_limit or 1000000
-            
-            if power_usage > actual_power_limit:
-                scale_factor = actual_power_limit / power_usage
-                for key in allocation:
-                    allocation[key] = int(allocation[key] * scale_factor)
-                reasoning += f" (Scaled down by {scale_factor:.2f} to meet power constraints)"
-            
-            # Calculate expected revenue and cost
-            revenue_breakdown = self.mara_client.calculate_expected_revenue(
-                allocation, inventory, current_prices
+        Returns as soon as the solver does, with a deterministic explanation;
+        ``narrate`` opts in to waiting for an LLM-written one instead. Invalid
+        or unsatisfiable constraints raise AllocationConstraintError.
+        """
+        
+        constraints = AllocationConstraints(
+            min_inference_share=inference_priority,
+            min_counts=dict(min_counts or {}),
+            max_counts=dict(max_counts or {}),
+            ratios=tuple(RatioConstraint(**ratio) for ratio in ratios or []),
+            reserved_headroom=reserved_headroom
+        )
+        actual_power_limit = power_limit or DEFAULT_POWER_LIMIT
+        # Reject bad constraints before any upstream I/O
+        constraints.validate(ALLOCATION_KEYS, actual_power_limit)
+        
+        # Step 1: Fetch market data
+        snapshot = await self.mara_client.get_snapshot()
+        current_prices = snapshot.prices
+        inventory = snapshot.inventory
+        site_status = snapshot.site_status
+        if not current_prices:
+            raise LookupError("MARA returned no price rows; cannot optimize the allocation")
+        
+        # Step 2: Solve for the exact profit-maximizing allocation
+        optimizer = AllocationOptimizer(self.mara_client.economics(inventory))
+        # Branch-and-bound can take a few hundred milliseconds; keep it off the event loop
+        result = await asyncio.to_thread(optimizer.solve, current_prices[0], actual_power_limit, constraints)
+        allocation = result.allocation
+        
+        # Step 3: Explain the allocation (the numbers are already final)
+        if narrate:
+            reasoning = await self._explain_allocation(
+                result, current_prices, site_status, target_revenue, constraints
             )
-            
-            if current_prices:
-                energy_price = current_prices[0].get("energy_price", 0)
-                expected_cost = power_usage * energy_price
-            else:
-                expected_cost = 0
-            
-            # Calculate efficiency score
-            if expected_cost > 0:
-                efficiency_score = min(100, (revenue_breakdown["total"] / expected_cost) * 20)
-            else:
-                efficiency_score = 50.0
-            
-            return {
-                "allocation": allocation,
-                "expected_revenue": revenue_breakdown["total"],
-                "expected_cost": expected_cost,
-                "efficiency_score": efficiency_score,
-                "reasoning": reasoning
-            }
-            
-        except Exception as e:
-            # Fallback allocation
-            return {
-                "allocation": {
-                    "air_miners": 0,
-                    "hydro_miners": 5,
-                    "immersion_miners": 10,
-                    "gpu_compute": 30,
-                    "asic_compute": 20
-                },
-                "expected_revenue": 45000.0,
-                "expected_cost": 35000.0,
-                "efficiency_score": 75.0,
-                "reasoning": f"Fallback allocation due to error: {str(e)}"
-            }
+        else:
+            reasoning = self._describe_allocation(result, target_revenue)
+        
+        # Step 4: Calculate metrics
+        revenue_breakdown = self.mara_client.calculate_expected_revenue(
+            allocation, inventory, current_prices
+        )
+        expected_cost = result.energy_cost
+        
+        # Calculate efficiency score
+        if expected_cost > 0:
+            efficiency_score = min(100, (revenue_breakdown["total"] / expected_cost) * 20)
+        else:
+            efficiency_score = 50.0
+        
+        return {
+            "allocation": allocation,
+            "expected_revenue": revenue_breakdown["total"],
+            "expected_cost": expected_cost,
+            "efficiency_score": efficiency_score,
+            "reasoning": reasoning,
+            "binding_constraints": list(result.binding_constraints)
+        }
     
     async def _analyze_market_conditions(
         self, 
@@ -131,56 +133,33 @@ class SimpleAllocationAgent:
         response = await self.llm.ainvoke(messages)
         return response.content
     
-    async def _generate_allocation(
+    async def _explain_allocation(
         self,
-        analysis: str,
+        result: OptimizationResult,
         current_prices: List[Dict[str, Any]],
-        inventory: Dict[str, Any],
         site_status: Dict[str, Any],
         target_revenue: Optional[float],
-        inference_priority: float,
-        power_limit: Optional[int]
-    ) -> Dict[str, Any]:
-        """Generate optimal resource allocation using AI"""
-        
-        system_prompt = """You are an optimization engine for resource allocation. Your PRIMARY GOAL is to MAXIMIZE REVENUE.
-        Generate an optimal allocation of mining and compute resources that produces the highest possible revenue.
-        
-        Return your response as a JSON object with:
-        {
-            "allocation": {
-                "air_miners": <number>,
-                "hydro_miners": <number>, 
-                "immersion_miners": <number>,
-                "gpu_compute": <number>,
-                "asic_compute": <number>
-            },
-            "reasoning": "<explanation of allocation decisions>"
-        }
-        
-        Constraints:
-        - Total power usage cannot exceed site power limit
-        - Maintain 70% inference priority (favor compute over mining when possible)
-        - PRIMARY OBJECTIVE: Maximize total revenue above all else
-        """
+        constraints: AllocationConstraints
+    ) -> str:
+        """Narrative for a solved allocation; falls back to a deterministic summary"""
         
-        total_power_limit = power_limit or 1000000
+        system_prompt = """You are a resource allocation analyst for a mining and compute operation.
+        An exact optimizer has already chosen the allocation below; do not change or second-guess the numbers.
+        Explain in 2-3 sentences why this allocation maximizes profit at current prices
+        and which operator constraints limited it."""
         
         human_prompt = f"""
-        Market Analysis: {analysis}
-        
-        Power Constraints:
-        - Total Power Limit: {total_power_limit}W
-        - Current Power Usage: {site_status.get('total_power_used', 0)}W
-        
-        REVENUE MAXIMIZATION PARAMETERS:
-        - PRIMARY GOAL: MAXIMIZE TOTAL REVENUE (this is most important)
-        - Inference Priority: 70% (favor compute over mining when revenue is similar)
-        - Current Market Prices: Hash=${current_prices[0].get('hash_price', 0):.2f}, Token=${current_prices[0].get('token_price', 0):.2f}, Energy=${current_prices[0].get('energy_price', 0):.3f}
-        
-        Calculate the allocation that produces the HIGHEST total revenue possible within power constraints.
-        Focus on the most profitable resource types given current market prices.
-        Return only the JSON object, no additional text.
+        Optimal Allocation: {json.dumps(result.allocation)}
+        Expected Revenue: ${result.revenue:,.2f}
+        Energy Cost: ${result.energy_cost:,.2f}
+        Profit: ${result.profit:,.2f}
+        Power Used: {result.power_used}W of {result.power_limit}W
+        Profit Per Machine: {json.dumps({key: round(value, 2) for key, value in result.unit_profit.items()})}
+        Current Market Prices: Hash=${current_prices[0].get('hash_price', 0):.2f}, Token=${current_prices[0].get('token_price', 0):.2f}, Energy=${current_prices[0].get('energy_price', 0):.3f}
+        Current Power Usage: {site_status.get('total_power_used', 0)}W
+        Target Revenue: {f"${target_revenue:,.2f}" if target_revenue else "none"}
+        Minimum Inference Power Share: {constraints.min_inference_share:.0%}
+        Binding Constraints: {json.dumps(list(result.binding_constraints))}
         """
         
         messages = [
@@ -188,40 +167,39 @@ class SimpleAllocationAgent:
             HumanMessage(content=human_prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
-        
         try:
-            # Extract JSON from response
-            response_text = response.content
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_text = response_text[json_start:json_end].strip()
-            else:
-                # Try to find JSON object in the response
-                start = response_text.find("{")
-                end = response_text.rfind("}") + 1
-                json_text = response_text[start:end]
-            
-            result = json.loads(json_text)
-            return {
-                "allocation": result.get("allocation", {}),
-                "reasoning": result.get("reasoning", "No reasoning provided")
-            }
-            
+            response = await asyncio.wait_for(self.llm.ainvoke(messages), self.narrative_timeout)
+            return response.content
+        except asyncio.TimeoutError:
+            print(f"Allocation narrative timed out after {self.narrative_timeout}s")
         except Exception as e:
-            print(f"Error parsing optimization response: {e}")
-            # Fallback allocation prioritizing inference
-            return {
-                "allocation": {
-                    "air_miners": 0,
-                    "hydro_miners": 5,
-                    "immersion_miners": 10,
-                    "gpu_compute": 30,
-                    "asic_compute": 20
-                },
-                "reasoning": "Fallback allocation due to parsing error"
-            }
+            print(f"Error generating allocation narrative: {e}")
+        return self._describe_allocation(result, target_revenue)
+    
+    def _describe_allocation(self, result: OptimizationResult, target_revenue: Optional[float]) -> str:
+        """Deterministic explanation of a solved allocation"""
+        used = [f"{count} {key}" for key, count in result.allocation.items() if count]
+        unprofitable = [key for key, value in result.unit_profit.items() if value <= 0]
+        
+        reasoning = (
+            f"{'Exact' if result.optimal else 'Budget-limited'} optimizer selected {', '.join(used) if used else 'no machines'} "
+            f"using {result.power_used}W of {result.power_limit}W, for ${result.revenue:,.2f} revenue "
+            f"and ${result.profit:,.2f} profit after ${result.energy_cost:,.2f} energy cost."
+        )
+        if not result.optimal:
+            reasoning += f" Optimality was not proven; at most ${result.gap:,.2f} profit may be missed."
+        if unprofitable:
+            reasoning += f" Excluded at current prices (no profit per machine): {', '.join(unprofitable)}."
+        if result.binding_constraints:
+            binding = [
+                f"{item['constraint']} (${item['profit_forgone']:,.2f} profit forgone)"
+                for item in result.binding_constraints
+            ]
+            reasoning += f" Binding constraints: {', '.join(binding)}."
+        if target_revenue:
+            status = "meets" if result.revenue >= target_revenue else "falls short of"
+            reasoning += f" This {status} the ${target_revenue:,.2f} revenue target."
+        return reasoning
     
     async def analyze_market_conditions(self) -> Dict[str, Any]:
         """Standalone market analysis"""
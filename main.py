@@ -1,8 +1,10 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from contextlib import asynccontextmanager
 import os
+import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -14,10 +16,60 @@ from agents.performance_optimizer_agent import PerformanceOptimizerAgent
 from agents.energy_management_agent import EnergyManagementAgent
 from utils.mara_client import MaraClient
 from utils.btc_client import BTCClient
+from utils.market_data import source_from_env
+from utils.price_store import PriceStore
+from utils.rate_limiter import Lane
+from utils.fleet import FleetManager
+from utils.allocation_optimizer import AllocationConstraintError
 
 load_dotenv()
 
-app = FastAPI(title="MARA Resource Allocation API", version="1.0.0")
+MARA_API_BASE_URL = os.getenv("MARA_API_BASE_URL", "https://mara-hackathon-api.onrender.com")
+
+mara_client = MaraClient(
+    api_key=os.getenv("MARA_API_KEY"),
+    base_url=MARA_API_BASE_URL,
+    price_tick_interval=float(os.getenv("MARA_PRICE_TICK_SECONDS", "300")),
+    max_connections=int(os.getenv("MARA_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("MARA_MAX_KEEPALIVE", "10")),
+    inventory_cache_path=os.getenv("MARA_INVENTORY_CACHE", ".cache/mara_inventory.json"),
+    deploy_coalesce_window=float(os.getenv("MARA_DEPLOY_WINDOW", "2.0")),
+    rate_limit=float(os.getenv("MARA_RATE_LIMIT", "20")),
+    rate_burst=int(os.getenv("MARA_RATE_BURST", "40")),
+    price_store=PriceStore(os.getenv("MARA_PRICE_DB", ".cache/mara_prices.sqlite3"), source=MARA_API_BASE_URL),
+)
+btc_client = BTCClient(
+    refresh_interval=float(os.getenv("BTC_REFRESH_SECONDS", "30")),
+    bar_cache_dir=os.getenv("BTC_BAR_CACHE_DIR", ".cache"),
+    source=source_from_env(),
+)
+fleet = FleetManager.from_env(
+    base_url=MARA_API_BASE_URL,
+    max_concurrency=int(os.getenv("MARA_FLEET_CONCURRENCY", "8")),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream connections on startup and release them on shutdown"""
+    await mara_client.start()
+    try:
+        await mara_client.load_inventory()
+    except Exception as e:
+        print(f"Error warming inventory catalog: {e}")
+    try:
+        await mara_client.load_price_history()
+    except Exception as e:
+        print(f"Error loading stored price history: {e}")
+    await btc_client.start()
+    try:
+        yield
+    finally:
+        await btc_client.close()
+        await mara_client.close()
+        if fleet is not None:
+            await fleet.close()
+
+app = FastAPI(title="MARA Resource Allocation API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,8 +79,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-mara_client = MaraClient(api_key=os.getenv("MARA_API_KEY"))
-btc_client = BTCClient()
+@app.middleware("http")
+async def assign_mara_lane(request, call_next):
+    """Run agent endpoints' MARA calls in the background rate-limiter lane"""
+    if request.url.path.startswith("/agents/"):
+        with mara_client.priority(Lane.BACKGROUND):
+            return await call_next(request)
+    return await call_next(request)
 
 # Initialize all agents
 allocation_agent = SimpleAllocationAgent(
@@ -59,10 +116,21 @@ energy_management_agent = EnergyManagementAgent(
     mara_client=mara_client
 )
 
+class RatioSpec(BaseModel):
+    numerator: str
+    denominator: str
+    min_ratio: Optional[float] = None
+    max_ratio: Optional[float] = None
+
 class AllocationRequest(BaseModel):
     target_revenue: Optional[float] = None
-    inference_priority: float = 0.8  # 0-1 scale, higher = prioritize inference more
+    inference_priority: float = 0.8  # 0-1 scale, minimum share of used power going to inference
     power_limit: Optional[int] = None
+    min_counts: Optional[Dict[str, int]] = None
+    max_counts: Optional[Dict[str, int]] = None
+    ratios: Optional[List[RatioSpec]] = None
+    reserved_headroom: int = 0  # Watts kept free below the power limit
+    narrate: bool = False  # Wait for an LLM-written explanation (slow) instead of the built-in one
 
 class AllocationResponse(BaseModel):
     allocation: Dict[str, int]
@@ -70,6 +138,7 @@ class AllocationResponse(BaseModel):
     expected_cost: float
     efficiency_score: float
     reasoning: str
+    binding_constraints: List[Dict[str, Any]] = []
 
 class ChatMessage(BaseModel):
     message: str
@@ -85,17 +154,29 @@ class ChatResponse(BaseModel):
 async def root():
     return {"message": "MARA Resource Allocation API"}
 
+def btc_freshness() -> Dict[str, Any]:
+    btc_snapshot = btc_client.get_snapshot()
+    if btc_snapshot is None:
+        return {"fetched_at": None, "age_seconds": None, "version": None}
+    return {
+        "fetched_at": btc_snapshot.fetched_at.isoformat(),
+        "age_seconds": btc_snapshot.age,
+        "version": btc_snapshot.version,
+    }
+
 @app.get("/api/status")
 async def get_status():
     """Get current site status from MARA API"""
     try:
-        site_status = await mara_client.get_site_status()
-        prices = await mara_client.get_current_prices()
-        btc_data = await btc_client.get_btc_data()
+        snapshot, btc_data = await asyncio.gather(
+            mara_client.get_snapshot(parts=("site_status", "prices")),
+            btc_client.get_btc_data()
+        )
         return {
-            "site_status": site_status,
-            "current_prices": prices,
-            "btc_data": btc_data
+            "site_status": snapshot.site_status,
+            "current_prices": snapshot.prices,
+            "btc_data": btc_data,
+            "freshness": {**snapshot.freshness(), "btc_data": btc_freshness()}
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -107,9 +188,16 @@ async def optimize_allocation(request: AllocationRequest):
         result = await allocation_agent.optimize_allocation(
             target_revenue=request.target_revenue,
             inference_priority=request.inference_priority,
-            power_limit=request.power_limit
+            power_limit=request.power_limit,
+            min_counts=request.min_counts,
+            max_counts=request.max_counts,
+            ratios=[ratio.model_dump() for ratio in request.ratios or []],
+            reserved_headroom=request.reserved_headroom,
+            narrate=request.narrate
         )
         return result
+    except AllocationConstraintError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -118,7 +206,66 @@ async def deploy_allocation(allocation: Dict[str, int]):
     """Deploy the optimized allocation to MARA"""
     try:
         result = await mara_client.update_allocation(allocation)
-        return {"status": "deployed", "result": result}
+        return {"status": result["status"], "result": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/mara/metrics")
+async def get_mara_metrics():
+    """Get MARA client cache and traffic metrics"""
+    try:
+        return mara_client.get_metrics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/mara/health")
+async def get_mara_health():
+    """Get MARA upstream circuit breaker state and latency"""
+    try:
+        return mara_client.get_upstream_health()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/mara/inventory/refresh")
+async def refresh_inventory():
+    """Re-fetch the static MARA inventory and update the local catalog"""
+    try:
+        catalog = await mara_client.refresh_inventory()
+        return {"inventory": catalog.to_dict(), "fetched_at": catalog.fetched_at}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/mara/prices/history")
+async def get_price_history(start: Optional[str] = None, end: Optional[str] = None, limit: int = 1000):
+    """Get stored MARA price ticks between two ISO timestamps"""
+    try:
+        prices = await mara_client.get_price_range(start=start, end=end, limit=limit)
+        return {"prices": prices, "count": len(prices)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _require_fleet() -> FleetManager:
+    if fleet is None:
+        raise HTTPException(status_code=404, detail="No fleet configured (set MARA_SITES)")
+    return fleet
+
+@app.get("/api/fleet/status")
+async def get_fleet_status():
+    """Get site status and latest prices for every configured site"""
+    manager = _require_fleet()
+    try:
+        results = await manager.get_status_all()
+        return {site: result.to_dict() for site, result in results.items()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/fleet/deploy")
+async def deploy_fleet(allocations: Dict[str, Dict[str, int]]):
+    """Deploy per-site allocations in parallel"""
+    manager = _require_fleet()
+    try:
+        results = await manager.deploy_all(allocations)
+        return {site: result.to_dict() for site, result in results.items()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,112 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from utils.allocation_optimizer import (
+    AllocationConstraintError,
+    AllocationConstraints,
+    AllocationOptimizer,
+    InfeasibleAllocationError,
+    RatioConstraint,
+)
+from utils.economics import EconomicsKernel
+from utils.simplex import solve_lp
+
+INVENTORY = {
+    "inference": {"asic": {"power": 15000, "tokens": 50000}, "gpu": {"power": 5000, "tokens": 1000}},
+    "miners": {
+        "air": {"hashrate": 1000, "power": 3500},
+        "hydro": {"hashrate": 5000, "power": 5000},
+        "immersion": {"hashrate": 10000, "power": 10000},
+    },
+}
+
+KERNEL = EconomicsKernel.from_inventory(INVENTORY)
+
+def _brute_force(unit_profit: np.ndarray, power_limit: int, constraints: AllocationConstraints):
+    """Best profit over every count vector that fits, or None if none is feasible"""
+    usable = power_limit - constraints.reserved_headroom
+    ranges = [
+        range(constraints.min_counts.get(key, 0), min(constraints.max_counts.get(key, usable), usable // int(KERNEL.power[i])) + 1)
+        for i, key in enumerate(KERNEL.keys)
+    ]
+    X = np.array(list(itertools.product(*ranges)), dtype=np.float64).reshape(-1, len(KERNEL.keys))
+    power = X @ KERNEL.power
+    feasible = power <= usable
+    if constraints.min_inference_share > 0:
+        inference_power = X @ (KERNEL.power * KERNEL.is_inference)
+        feasible &= inference_power >= constraints.min_inference_share * power - 1e-6
+    for ratio in constraints.ratios:
+        n, d = KERNEL.keys.index(ratio.numerator), KERNEL.keys.index(ratio.denominator)
+        if ratio.min_ratio is not None:
+            feasible &= X[:, n] >= ratio.min_ratio * X[:, d] - 1e-9
+        if ratio.max_ratio is not None:
+            feasible &= X[:, n] <= ratio.max_ratio * X[:, d] + 1e-9
+    if not feasible.any():
+        return None
+    return float((X[feasible] @ unit_profit).max())
+
+def _random_constraints(rng: random.Random) -> AllocationConstraints:
+    keys = list(KERNEL.keys)
+    min_counts = {key: rng.randint(0, 2) for key in rng.sample(keys, rng.randint(0, 2))}
+    max_counts = {key: rng.randint(min_counts.get(key, 0), 8) for key in rng.sample(keys, rng.randint(0, 2))}
+    ratios = ()
+    if rng.random() < 0.5:
+        numerator, denominator = rng.sample(keys, 2)
+        ratios = (RatioConstraint(numerator, denominator, min_ratio=rng.choice([None, 0.5, 1.37]), max_ratio=3.0),)
+    return AllocationConstraints(
+        min_inference_share=rng.choice([0.0, 0.3, 0.7, 0.9]),
+        min_counts=min_counts,
+        max_counts=max_counts,
+        ratios=ratios,
+        reserved_headroom=rng.choice([0, 5000]),
+    )
+
+def test_solve_matches_brute_force():
+    optimizer = AllocationOptimizer(KERNEL)
+    rng = random.Random(7)
+    for _ in range(60):
+        prices = {
+            "energy_price": rng.uniform(0.1, 3.0),
+            "hash_price": rng.uniform(0.5, 10.0),
+            "token_price": rng.uniform(0.1, 5.0),
+        }
+        power_limit = rng.choice([20000, 35000, 45000, 60000])
+        constraints = _random_constraints(rng)
+        unit_profit = KERNEL.unit_profit(prices)[0]
+        expected = _brute_force(unit_profit, power_limit, constraints)
+
+        if expected is None:
+            with pytest.raises(InfeasibleAllocationError):
+                optimizer.solve(prices, power_limit, constraints)
+            continue
+        result = optimizer.solve(prices, power_limit, constraints)
+        assert result.optimal
+        assert result.power_used <= power_limit - constraints.reserved_headroom
+        assert result.profit == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+def test_solve_lp_optimum_and_infeasibility():
+    # max x + y  s.t.  x + 2y <= 4,  3x + y <= 6
+    y, value = solve_lp(np.array([1.0, 1.0]), np.array([[1.0, 2.0], [3.0, 1.0]]), np.array([4.0, 6.0]))
+    assert np.allclose(y, [1.6, 1.2])
+    assert value == pytest.approx(2.8)
+    # x >= 1 and x <= 0.5 cannot both hold
+    assert solve_lp(np.array([1.0]), np.array([[-1.0], [1.0]]), np.array([-1.0, 0.5])) is None
+
+@pytest.mark.parametrize("constraints", [
+    AllocationConstraints(ratios=(RatioConstraint("gpu_compute", "asic_compute", min_ratio=math.inf),)),
+    AllocationConstraints(ratios=(RatioConstraint("gpu_compute", "asic_compute", max_ratio=math.nan),)),
+    AllocationConstraints(max_counts={"gpu_compute": math.inf}),
+    AllocationConstraints(min_inference_share=math.nan),
+])
+def test_non_finite_bounds_are_rejected(constraints):
+    with pytest.raises(AllocationConstraintError):
+        AllocationOptimizer(KERNEL).solve({"energy_price": 1.0, "hash_price": 2.0, "token_price": 3.0}, 60000, constraints)
+
+def test_unmeetable_minimums_raise_infeasible():
+    constraints = AllocationConstraints(min_counts={"asic_compute": 5})
+    with pytest.raises(InfeasibleAllocationError):
+        AllocationOptimizer(KERNEL).solve({"energy_price": 1.0, "hash_price": 2.0, "token_price": 3.0}, 60000, constraints)
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from utils.deploy_coalescer import DeployCoalescer
+
+class BlockingSender:
+    """Records sent allocations; each send waits until released"""
+
+    def __init__(self):
+        self.sent = []
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+
+    async def __call__(self, allocation):
+        self.sent.append(allocation)
+        self.started.set()
+        await self.release.wait()
+        return {"ok": allocation}
+
+def test_isolated_deploy_is_sent_without_waiting_for_the_window():
+    async def scenario():
+        sent = []
+
+        async def send(allocation):
+            sent.append(allocation)
+            return {}
+
+        coalescer = DeployCoalescer(send, window=60.0)
+        outcome = await asyncio.wait_for(coalescer.submit({"gpu_compute": 1}), timeout=1.0)
+        assert outcome["status"] == "sent"
+        assert sent == [{"gpu_compute": 1}]
+
+        assert (await coalescer.submit({"gpu_compute": 1}))["status"] == "skipped"
+
+    asyncio.run(scenario())
+
+def test_deploys_during_a_send_are_merged_into_the_next_one():
+    async def scenario():
+        sender = BlockingSender()
+        coalescer = DeployCoalescer(sender, window=0.0)
+        first = asyncio.ensure_future(coalescer.submit({"gpu_compute": 1}))
+        await sender.started.wait()
+
+        second = asyncio.ensure_future(coalescer.submit({"gpu_compute": 2}))
+        third = asyncio.ensure_future(coalescer.submit({"gpu_compute": 3}))
+        await asyncio.sleep(0)
+        sender.release.set()
+
+        assert (await first)["status"] == "sent"
+        assert (await second)["status"] == "merged"
+        assert (await third)["status"] == "sent"
+        assert sender.sent == [{"gpu_compute": 1}, {"gpu_compute": 3}]
+
+    asyncio.run(scenario())
+
+def test_repeat_of_in_flight_allocation_is_skipped_once_it_lands():
+    async def scenario():
+        sender = BlockingSender()
+        coalescer = DeployCoalescer(sender, window=0.0)
+        first = asyncio.ensure_future(coalescer.submit({"gpu_compute": 1}))
+        await sender.started.wait()
+
+        # Not idle, so it cannot be skipped up front; it is compared when its batch flushes
+        repeat = asyncio.ensure_future(coalescer.submit({"gpu_compute": 1}))
+        await asyncio.sleep(0)
+        sender.release.set()
+
+        assert (await first)["status"] == "sent"
+        assert (await repeat)["status"] == "skipped"
+        assert sender.sent == [{"gpu_compute": 1}]
+
+    asyncio.run(scenario())
+
+def test_close_fails_in_flight_and_pending_waiters():
+    async def scenario():
+        sender = BlockingSender()
+        coalescer = DeployCoalescer(sender, window=0.0)
+        in_flight = asyncio.ensure_future(coalescer.submit({"gpu_compute": 1}))
+        await sender.started.wait()
+        pending = asyncio.ensure_future(coalescer.submit({"gpu_compute": 2}))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(coalescer.close(), timeout=1.0)
+
+        for waiter in (in_flight, pending):
+            with pytest.raises(RuntimeError, match="closing"):
+                await asyncio.wait_for(waiter, timeout=1.0)
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+from utils.mara_client import MaraClient
+from utils.price_store import PriceStore
+
+UPSTREAM = "http://mara.test"
+
+def _row(timestamp: str, energy_price: float = 1.0) -> dict:
+    return {"timestamp": timestamp, "energy_price": energy_price, "hash_price": 2.0, "token_price": 3.0}
+
+def test_store_drops_ticks_from_another_source(tmp_path):
+    path = str(tmp_path / "prices.sqlite3")
+    store = PriceStore(path, source="http://simulator")
+    store.append([_row("2026-10-18T10:00:00")])
+    store.close()
+
+    store = PriceStore(path, source=UPSTREAM)
+    assert store.count() == 0
+    store.append([_row("2025-06-21T10:00:00")])
+    store.close()
+
+    store = PriceStore(path, source=UPSTREAM)
+    assert store.count() == 1
+    store.close()
+
+def test_upstream_older_than_history_resets_it(tmp_path):
+    """Stored ticks newer than the upstream's must not hide its rows"""
+    upstream_rows = [_row("2025-06-21T10:05:00", 0.5), _row("2025-06-21T10:00:00", 0.4)]
+
+    async def scenario():
+        store = PriceStore(str(tmp_path / "prices.sqlite3"), source=UPSTREAM)
+        store.append([_row("2026-10-18T10:00:00", 9.0)])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=upstream_rows)
+
+        http_client = httpx.AsyncClient(base_url=UPSTREAM, transport=httpx.MockTransport(handler))
+        client = MaraClient(api_key="test", http_client=http_client, price_store=store)
+        try:
+            assert await client.load_price_history() == 1
+            prices = await client.get_current_prices()
+            assert [row["timestamp"] for row in prices] == ["2025-06-21T10:05:00", "2025-06-21T10:00:00"]
+            assert [row["timestamp"] for row in store.latest(10)] == ["2025-06-21T10:05:00", "2025-06-21T10:00:00"]
+        finally:
+            await client.close()
+            await http_client.aclose()
+
+    asyncio.run(scenario())
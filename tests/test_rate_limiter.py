@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from utils.rate_limiter import Lane, LaneTicket, PriorityRateLimiter
+
+def test_token_granted_to_a_cancelled_waiter_is_returned():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=0.001, burst=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        # Grant the token the way the pump does, then cancel before the waiter resumes
+        limiter._next_waiter().set_result(None)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter._tokens == pytest.approx(1.0, abs=0.01)
+
+    asyncio.run(scenario())
+
+def test_cancelled_queued_waiter_leaves_its_queue():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=1.0, burst=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire(Lane.BACKGROUND))
+        await asyncio.sleep(0)
+        assert len(limiter._waiters[Lane.BACKGROUND]) == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not limiter._waiters[Lane.BACKGROUND]
+
+    asyncio.run(scenario())
+
+def test_promoted_ticket_is_served_before_earlier_background_waiters():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=50.0, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def take(name, lane=Lane.BACKGROUND, ticket=None):
+            await limiter.acquire(lane, ticket=ticket)
+            order.append(name)
+
+        ticket = LaneTicket(Lane.BACKGROUND)
+        early = asyncio.ensure_future(take("early"))
+        await asyncio.sleep(0)
+        shared = asyncio.ensure_future(take("shared", ticket=ticket))
+        await asyncio.sleep(0)
+        assert len(limiter._waiters[Lane.BACKGROUND]) == 2
+
+        ticket.promote(Lane.INTERACTIVE)
+        assert len(limiter._waiters[Lane.INTERACTIVE]) == 1
+        await asyncio.gather(early, shared)
+
+        assert order == ["shared", "early"]
+        # The initial acquire plus the promoted one
+        assert limiter.stats()["lanes"]["interactive"]["acquired"] == 2
+
+    asyncio.run(scenario())
+
+def test_promotion_never_lowers_priority():
+    ticket = LaneTicket(Lane.INTERACTIVE)
+    ticket.promote(Lane.BACKGROUND)
+    assert ticket.lane == Lane.INTERACTIVE
@@ -0,0 +1,44 @@
+import asyncio
+
+import httpx
+
+from utils.mara_client import MaraClient
+
+def test_read_after_deploy_does_not_join_older_fetch():
+    """A status read made after a deploy must not be served a /machines fetch that started before it"""
+
+    async def scenario():
+        state = {"alloc": "old"}
+        release = asyncio.Event()
+        first_get_started = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "PUT":
+                state["alloc"] = "new"
+                return httpx.Response(200, json={"ok": True})
+            observed = dict(state)
+            if not first_get_started.is_set():
+                first_get_started.set()
+                await release.wait()
+            return httpx.Response(200, json=observed)
+
+        http_client = httpx.AsyncClient(base_url="http://mara.test", transport=httpx.MockTransport(handler))
+        client = MaraClient(api_key="test", http_client=http_client)
+        try:
+            before = asyncio.ensure_future(client.get_site_status())
+            await first_get_started.wait()
+
+            await client.update_allocation({"air_miners": 1})
+            after = asyncio.ensure_future(client.get_site_status())
+            await asyncio.sleep(0)
+            release.set()
+
+            await before
+            assert await after == {"alloc": "new"}
+            reading = await client.get_site_status_reading()
+            assert reading.value == {"alloc": "new"}
+        finally:
+            await client.close()
+            await http_client.aclose()
+
+    asyncio.run(scenario())
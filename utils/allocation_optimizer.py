@@ -0,0 +1,459 @@
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, field, replace
+from functools import reduce
+from math import gcd
+from typing import Dict, Any, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.economics import EconomicsKernel, Prices
+from utils.simplex import solve_lp
+
+DEFAULT_POWER_LIMIT = 1000000
+
+class AllocationConstraintError(ValueError):
+    """Raised for operator constraints that are invalid or cannot be met (a client error)"""
+
+class InfeasibleAllocationError(AllocationConstraintError):
+    """Raised when no allocation satisfies the requested constraints"""
+
+@dataclass(frozen=True)
+class RatioConstraint:
+    """Bounds on count(numerator) / count(denominator), enforced as linear inequalities"""
+    numerator: str
+    denominator: str
+    min_ratio: Optional[float] = None
+    max_ratio: Optional[float] = None
+
+@dataclass(frozen=True)
+class AllocationConstraints:
+    """Operator policy the optimizer must satisfy on top of the site power limit.
+
+    ``min_inference_share`` is the minimum fraction of used power going to
+    inference machines, and ``reserved_headroom`` is power (W) kept free below
+    the limit. Counts are per allocation key.
+    """
+    min_inference_share: float = 0.0
+    min_counts: Mapping[str, int] = field(default_factory=dict)
+    max_counts: Mapping[str, int] = field(default_factory=dict)
+    ratios: Tuple[RatioConstraint, ...] = ()
+    reserved_headroom: int = 0
+
+    @property
+    def is_trivial(self) -> bool:
+        """True if only the (headroom-reduced) power limit applies"""
+        return not (self.min_inference_share > 0 or self.min_counts or self.max_counts or self.ratios)
+
+    def validate(self, keys: Tuple[str, ...], power_limit: int) -> None:
+        bounds = [self.min_inference_share, self.reserved_headroom]
+        bounds += list(self.min_counts.values()) + list(self.max_counts.values())
+        bounds += [value for ratio in self.ratios for value in (ratio.min_ratio, ratio.max_ratio) if value is not None]
+        if not all(math.isfinite(value) for value in bounds):
+            raise AllocationConstraintError("Constraint bounds must be finite numbers")
+        if not 0.0 <= self.min_inference_share <= 1.0:
+            raise AllocationConstraintError("min_inference_share must be between 0 and 1")
+        if not 0 <= self.reserved_headroom <= power_limit:
+            raise AllocationConstraintError("reserved_headroom must be between 0 and the power limit")
+        named = list(self.min_counts) + list(self.max_counts)
+        named += [key for ratio in self.ratios for key in (ratio.numerator, ratio.denominator)]
+        unknown = sorted(set(named) - set(keys))
+        if unknown:
+            raise AllocationConstraintError(f"Unknown machine types: {unknown}")
+        if any(count < 0 for count in list(self.min_counts.values()) + list(self.max_counts.values())):
+            raise AllocationConstraintError("Machine count bounds must be non-negative")
+        conflicting = sorted(key for key, low in self.min_counts.items() if low > self.max_counts.get(key, low))
+        if conflicting:
+            raise AllocationConstraintError(f"min_counts exceed max_counts for: {conflicting}")
+        for ratio in self.ratios:
+            if ratio.min_ratio is None and ratio.max_ratio is None:
+                raise AllocationConstraintError(f"Ratio {ratio.numerator}/{ratio.denominator} needs min_ratio or max_ratio")
+            if any(value is not None and value < 0 for value in (ratio.min_ratio, ratio.max_ratio)):
+                raise AllocationConstraintError("Ratio bounds must be non-negative")
+
+class _Search(NamedTuple):
+    """Outcome of a branch-and-bound search"""
+    counts: Optional[List[int]]
+    upper_bound: float
+    # False if the node budget ran out before optimality was proven
+    exhausted: bool
+
+@dataclass(frozen=True)
+class OptimizationResult:
+    """An optimal allocation together with the economics it was chosen on"""
+    allocation: Dict[str, int]
+    revenue: float
+    energy_cost: float
+    profit: float
+    power_used: int
+    power_limit: int
+    unit_profit: Dict[str, float]
+    solve_ms: float
+    binding_constraints: Tuple[Dict[str, Any], ...] = ()
+    # False if the search budget ran out; ``gap`` bounds the profit that may be missing
+    optimal: bool = True
+    gap: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "allocation": self.allocation,
+            "revenue": self.revenue,
+            "energy_cost": self.energy_cost,
+            "profit": self.profit,
+            "power_used": self.power_used,
+            "power_limit": self.power_limit,
+            "unit_profit": self.unit_profit,
+            "solve_ms": self.solve_ms,
+            "binding_constraints": list(self.binding_constraints),
+            "optimal": self.optimal,
+            "gap": self.gap,
+        }
+
+class AllocationOptimizer:
+    """Exact integer allocation maximizing revenue minus energy cost under a power limit.
+
+    With fixed prices every machine contributes a constant profit per unit, so
+    the problem is an unbounded knapsack over the machine types. Powers are
+    divided by their GCD (500 W for the MARA inventory) and solved by dynamic
+    programming, which is exact. For large limits most of the capacity is
+    provably filled with the densest machine type, so only a bounded residual
+    is searched and solve time does not grow with the power limit.
+
+    Operator constraints (per-type bounds, a minimum inference power share,
+    count ratios) are solved by best-first branch-and-bound over the integer
+    counts, bounded by LP relaxations, within ``node_limit`` LP solves; the
+    result says whether optimality was proven and how large the gap can be.
+    It also reports which constraints bind: those whose relaxation would
+    raise profit, with the profit forgone. Each of those re-solves starts
+    from the chosen allocation, so a constraint whose relaxed LP cannot beat
+    it costs a single LP, and is capped at ``binding_node_limit`` LP solves.
+    """
+
+    def __init__(self, kernel: EconomicsKernel, node_limit: int = 1000, binding_node_limit: int = 100):
+        self.kernel = kernel
+        self.node_limit = node_limit
+        self.binding_node_limit = binding_node_limit
+
+    def solve(
+        self,
+        prices: Prices,
+        power_limit: int = DEFAULT_POWER_LIMIT,
+        constraints: Optional[AllocationConstraints] = None
+    ) -> OptimizationResult:
+        """Optimal allocation for one /prices row (the first row if several are given)"""
+        started = time.perf_counter()
+        constraints = constraints or AllocationConstraints()
+        constraints.validate(self.kernel.keys, power_limit)
+        unit_profit = self.kernel.unit_profit(prices)[0]
+
+        search = self._solve_counts(unit_profit, power_limit, constraints, self.node_limit)
+        if search.counts is None:
+            if search.exhausted:
+                raise InfeasibleAllocationError("No allocation satisfies the requested constraints within the power limit")
+            raise InfeasibleAllocationError(
+                f"No allocation satisfying the constraints was found within {self.node_limit} search nodes"
+            )
+        allocation = self.kernel.to_allocation(search.counts)
+        result = self.evaluate(allocation, prices, power_limit)
+        binding = tuple(self._binding_constraints(unit_profit, power_limit, constraints, search.counts, result.profit))
+        return replace(
+            result,
+            binding_constraints=binding,
+            optimal=search.exhausted,
+            gap=max(0.0, search.upper_bound - result.profit),
+            solve_ms=(time.perf_counter() - started) * 1000.0
+        )
+
+    def _solve_counts(
+        self,
+        unit_profit: np.ndarray,
+        power_limit: int,
+        constraints: AllocationConstraints,
+        node_limit: int,
+        incumbent: Optional[List[int]] = None
+    ) -> _Search:
+        usable = int(power_limit) - constraints.reserved_headroom
+        if constraints.is_trivial:
+            counts = self._solve_unconstrained(unit_profit, usable)
+            return _Search(counts, float(unit_profit @ np.array(counts, dtype=np.float64)), True)
+        return self._branch_and_bound(unit_profit, usable, constraints, node_limit, incumbent)
+
+    def _solve_unconstrained(self, unit_profit: np.ndarray, power_limit: int) -> List[int]:
+        power = [int(p) for p in self.kernel.power]
+
+        items = [i for i, value in enumerate(unit_profit) if value > 0 and power[i] > 0]
+        counts = [0] * len(power)
+        if items and power_limit > 0:
+            unit = reduce(gcd, [power[i] for i in items])
+            weights = {i: power[i] // unit for i in items}
+            capacity = int(power_limit) // unit
+
+            # Swapping any multiple-of-w_best weight of other machines for the densest
+            # type never loses profit, so some optimal solution uses fewer than w_best
+            # other machines and leaves less than w_best spare. Fix the densest copies
+            # such a solution must hold and search only the residual capacity.
+            best = max(items, key=lambda i: (unit_profit[i] / weights[i], -weights[i]))
+            reserve = weights[best] * (max(weights.values()) + 1)
+            fixed = max(0, (capacity - reserve) // weights[best])
+            counts[best] = fixed
+
+            for i, n in self._knapsack(items, weights, unit_profit, capacity - fixed * weights[best]).items():
+                counts[i] += n
+        return counts
+
+    def _linear_constraints(
+        self,
+        usable_power: int,
+        constraints: AllocationConstraints
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Constraint rows ``G @ x <= h`` plus per-type count bounds ``lo``/``hi``"""
+        keys = self.kernel.keys
+        power = self.kernel.power
+        rows = [power]
+        limits = [float(usable_power)]
+        if constraints.min_inference_share > 0:
+            # inference_power >= share * total_power, i.e. sum((share - is_inference) * power * x) <= 0
+            rows.append((constraints.min_inference_share - self.kernel.is_inference) * power)
+            limits.append(0.0)
+        for ratio in constraints.ratios:
+            n, d = keys.index(ratio.numerator), keys.index(ratio.denominator)
+            if ratio.min_ratio is not None:
+                row = np.zeros(len(keys))
+                row[d] += ratio.min_ratio
+                row[n] -= 1.0
+                rows.append(row)
+                limits.append(0.0)
+            if ratio.max_ratio is not None:
+                row = np.zeros(len(keys))
+                row[n] += 1.0
+                row[d] -= ratio.max_ratio
+                rows.append(row)
+                limits.append(0.0)
+
+        lo = np.array([constraints.min_counts.get(key, 0) for key in keys], dtype=np.float64)
+        capacity = np.floor(np.maximum(usable_power, 0) / np.where(power > 0, power, np.inf))
+        hi = np.array([
+            min(constraints.max_counts.get(key, math.inf), capacity[i] if power[i] > 0 else lo[i])
+            for i, key in enumerate(keys)
+        ], dtype=np.float64)
+        return np.array(rows, dtype=np.float64), np.array(limits), lo, hi
+
+    def _branch_and_bound(
+        self,
+        unit_profit: np.ndarray,
+        usable_power: int,
+        constraints: AllocationConstraints,
+        node_limit: int,
+        incumbent: Optional[List[int]] = None
+    ) -> _Search:
+        """Best-first branch-and-bound on LP relaxations, within ``node_limit`` LP solves"""
+        G, h, lo, hi = self._linear_constraints(usable_power, constraints)
+        best_counts: Optional[np.ndarray] = None
+        best_value = -math.inf
+        if incumbent is not None:
+            best_counts = np.array(incumbent, dtype=np.float64)
+            best_value = float(unit_profit @ best_counts)
+
+        def improves(bound: float) -> bool:
+            return best_counts is None or bound > best_value + 1e-9 * max(1.0, abs(best_value))
+
+        # Open nodes keyed by their relaxation bound, best first
+        heap: List[Tuple[float, int, np.ndarray, np.ndarray, np.ndarray]] = []
+        order = itertools.count()
+        nodes = 0
+
+        def push(lo: np.ndarray, hi: np.ndarray) -> None:
+            nonlocal nodes
+            if np.any(lo > hi):
+                return
+            nodes += 1
+            relaxed = self._relaxation(unit_profit, G, h, lo, hi)
+            if relaxed is not None and improves(relaxed[1]):
+                heapq.heappush(heap, (-relaxed[1], next(order), lo, hi, relaxed[0]))
+
+        push(lo, hi)
+        # The budget only stops a search that already holds a feasible allocation
+        while heap and improves(-heap[0][0]) and (nodes < node_limit or best_counts is None):
+            _, _, lo, hi, x = heapq.heappop(heap)
+
+            # Cheap incumbent: the relaxation rounded down and greedily topped up
+            floor = np.maximum(np.floor(x + 1e-9), lo)
+            if np.all(G @ floor <= h + 1e-7):
+                floor = self._fill(unit_profit, G, h, floor, hi)
+                if improves(float(unit_profit @ floor)):
+                    best_counts, best_value = floor, float(unit_profit @ floor)
+
+            fraction = np.abs(x - np.round(x))
+            i = int(np.argmax(fraction))
+            if fraction[i] <= 1e-6:
+                rounded = np.round(x)
+                if np.all(G @ rounded <= h + 1e-7) and improves(float(unit_profit @ rounded)):
+                    best_counts, best_value = rounded, float(unit_profit @ rounded)
+                continue
+
+            down_hi, up_lo = hi.copy(), lo.copy()
+            down_hi[i] = math.floor(x[i])
+            up_lo[i] = math.floor(x[i]) + 1
+            push(lo, down_hi)
+            push(up_lo, hi)
+
+        open_bounds = [-entry[0] for entry in heap if improves(-entry[0])]
+        upper_bound = max([best_value] + open_bounds)
+        counts = None if best_counts is None else [int(count) for count in best_counts]
+        return _Search(counts, upper_bound, not open_bounds)
+
+    def _fill(
+        self,
+        unit_profit: np.ndarray,
+        G: np.ndarray,
+        h: np.ndarray,
+        x: np.ndarray,
+        hi: np.ndarray
+    ) -> np.ndarray:
+        """Add profitable machines, densest first, while every constraint still holds"""
+        x = x.copy()
+        density = unit_profit / np.where(self.kernel.power > 0, self.kernel.power, np.inf)
+        for i in np.argsort(-density):
+            if unit_profit[i] <= 0:
+                break
+            slack = h - G @ x
+            column = G[:, i]
+            limiting = column > 1e-12
+            room = hi[i] - x[i]
+            if limiting.any():
+                room = min(room, np.floor(np.min((slack[limiting] + 1e-7) / column[limiting])))
+            if room > 0:
+                x[i] += room
+        return x
+
+    @staticmethod
+    def _relaxation(
+        unit_profit: np.ndarray,
+        G: np.ndarray,
+        h: np.ndarray,
+        lo: np.ndarray,
+        hi: np.ndarray
+    ) -> Optional[Tuple[np.ndarray, float]]:
+        # Shift to y = x - lo >= 0 and express the upper bounds as rows
+        A = np.vstack([G, np.eye(len(lo))])
+        b = np.concatenate([h - G @ lo, hi - lo])
+        solution = solve_lp(unit_profit, A, b)
+        if solution is None:
+            return None
+        y, _ = solution
+        x = lo + y
+        return x, float(unit_profit @ x)
+
+    def _binding_constraints(
+        self,
+        unit_profit: np.ndarray,
+        power_limit: int,
+        constraints: AllocationConstraints,
+        counts: List[int],
+        profit: float
+    ) -> List[Dict[str, Any]]:
+        """Constraints whose relaxation would raise profit, with the profit forgone"""
+        keys = self.kernel.keys
+        x = dict(zip(keys, counts))
+        power_used = float(self.kernel.power @ np.array(counts, dtype=np.float64))
+        inference_power = float((self.kernel.power * self.kernel.is_inference) @ np.array(counts, dtype=np.float64))
+        usable = int(power_limit) - constraints.reserved_headroom
+
+        # (name, slack, relaxed power limit, relaxed constraints)
+        candidates = [("power_limit", usable - power_used, int(power_limit) + int(self.kernel.power.max()), constraints)]
+        if constraints.reserved_headroom:
+            candidates.append(("reserved_headroom", usable - power_used, power_limit, replace(constraints, reserved_headroom=0)))
+        if constraints.min_inference_share > 0:
+            share = inference_power / power_used if power_used else 1.0
+            candidates.append((
+                "min_inference_share", share - constraints.min_inference_share, power_limit,
+                replace(constraints, min_inference_share=0.0)
+            ))
+        for key, bound in constraints.min_counts.items():
+            relaxed = {k: v for k, v in constraints.min_counts.items() if k != key}
+            candidates.append((f"min_count:{key}", x[key] - bound, power_limit, replace(constraints, min_counts=relaxed)))
+        for key, bound in constraints.max_counts.items():
+            relaxed = {k: v for k, v in constraints.max_counts.items() if k != key}
+            candidates.append((f"max_count:{key}", bound - x[key], power_limit, replace(constraints, max_counts=relaxed)))
+        for i, ratio in enumerate(constraints.ratios):
+            others = constraints.ratios[:i] + constraints.ratios[i + 1:]
+            name = f"ratio:{ratio.numerator}/{ratio.denominator}"
+            if ratio.min_ratio is not None:
+                relaxed = others + ((replace(ratio, min_ratio=None),) if ratio.max_ratio is not None else ())
+                slack = x[ratio.numerator] - ratio.min_ratio * x[ratio.denominator]
+                candidates.append((f"{name}:min", slack, power_limit, replace(constraints, ratios=relaxed)))
+            if ratio.max_ratio is not None:
+                relaxed = others + ((replace(ratio, max_ratio=None),) if ratio.min_ratio is not None else ())
+                slack = ratio.max_ratio * x[ratio.denominator] - x[ratio.numerator]
+                candidates.append((f"{name}:max", slack, power_limit, replace(constraints, ratios=relaxed)))
+
+        binding = []
+        for name, slack, relaxed_limit, relaxed in candidates:
+            # The chosen allocation stays feasible when a constraint is relaxed, so it
+            # seeds the search and prunes every node that cannot beat it
+            search = self._solve_counts(unit_profit, relaxed_limit, relaxed, self.binding_node_limit, incumbent=counts)
+            gain = float(unit_profit @ np.array(search.counts, dtype=np.float64)) - profit
+            if gain > 1e-9 * max(1.0, abs(profit)) or not search.exhausted:
+                binding.append({
+                    "constraint": name,
+                    "slack": float(slack),
+                    "profit_forgone": gain,
+                    # False if the budget ran out: profit_forgone is then a lower bound
+                    "exact": search.exhausted,
+                })
+        return binding
+
+    def evaluate(
+        self,
+        allocation: Dict[str, int],
+        prices: Prices,
+        power_limit: int = DEFAULT_POWER_LIMIT
+    ) -> OptimizationResult:
+        """Score an allocation the same way solve() does"""
+        price_row = self.kernel.price_matrix(prices)[:1]
+        revenue = float(self.kernel.revenue(allocation, price_row)["total"][0, 0])
+        energy_cost = float(self.kernel.energy_cost(allocation, price_row)[0, 0])
+        unit_profit = self.kernel.unit_profit(price_row)[0]
+        return OptimizationResult(
+            allocation=allocation,
+            revenue=revenue,
+            energy_cost=energy_cost,
+            profit=revenue - energy_cost,
+            power_used=int(self.kernel.power_usage(allocation)[0]),
+            power_limit=int(power_limit),
+            unit_profit={key: float(value) for key, value in zip(self.kernel.keys, unit_profit)},
+            solve_ms=0.0,
+        )
+
+    @staticmethod
+    def _knapsack(
+        items: List[int],
+        weights: Dict[int, int],
+        values: Any,
+        capacity: int
+    ) -> Dict[int, int]:
+        """Unbounded knapsack by DP over capacity units; returns counts per item"""
+        best = [0.0] * (capacity + 1)
+        choice = [-1] * (capacity + 1)
+        for c in range(1, capacity + 1):
+            best[c] = best[c - 1]
+            for i in items:
+                w = weights[i]
+                if w <= c:
+                    value = best[c - w] + values[i]
+                    if value > best[c]:
+                        best[c] = value
+                        choice[c] = i
+
+        counts: Dict[int, int] = {}
+        c = capacity
+        while c > 0:
+            i = choice[c]
+            if i < 0:
+                c -= 1
+            else:
+                counts[i] = counts.get(i, 0) + 1
+                c -= weights[i]
+        return counts
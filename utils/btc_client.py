@@ -1,89 +1,194 @@
-import yfinance as yf
 from typing import Dict, Any, Optional
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+from datetime import datetime, timezone
+
+from utils.bar_store import BarStore
+from utils.btc_feed import BTCFeed, BTCSnapshot
+from utils.rolling_ohlcv import RollingOHLCV
+from utils.market_data import MarketDataSource, YahooChartSource, YahooFinanceSource
+from utils.single_flight import SingleFlight
 
 class BTCClient:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=2)
+    def __init__(
+        self,
+        symbol: str = "BTC-USD",
+        info_ttl: float = 6 * 3600,
+        info_retry: float = 300.0,
+        bar_window: float = 86400.0,
+        bar_capacity: int = 40320,
+        bar_backfill: float = 7 * 86400.0,
+        bar_cache_dir: Optional[str] = None,
+        refresh_interval: float = 30.0,
+        source: Optional[MarketDataSource] = None
+    ):
+        self.symbol = symbol
+        self.source = source or YahooChartSource(symbol, fallback=YahooFinanceSource(symbol))
+        self.bar_window = bar_window
+        self.bar_capacity = bar_capacity
+        self.bar_backfill = bar_backfill
+        self.bar_cache_dir = bar_cache_dir
+        # Bars per interval (up to bar_capacity of them), extended incrementally on each fetch
+        self._bars: Dict[str, BarStore] = {}
+        # Rolling high/low/volume/VWAP per interval, fed only the newly fetched bars
+        self._rolling: Dict[str, RollingOHLCV] = {}
+        self._single_flight = SingleFlight()
+        self.info_ttl = info_ttl
+        self.info_retry = info_retry
         self._last_price = None
         self._last_data = None
-    
+        # Market cap comes from a slow fundamentals lookup; refreshed in the background
+        self._market_cap: Optional[float] = None
+        self._info_expires_at = 0.0
+        self._info_task: Optional[asyncio.Task] = None
+        # Once started, handlers read the feed's snapshot instead of calling the source
+        self.feed = BTCFeed(self.fetch_btc_data, interval=refresh_interval)
+
+    def get_market_cap(self) -> float:
+        """Cached market cap; never blocks, schedules a refresh when expired"""
+        if time.monotonic() >= self._info_expires_at and (self._info_task is None or self._info_task.done()):
+            self._info_task = asyncio.ensure_future(self._refresh_market_cap())
+        return self._market_cap or 0
+
+    async def _refresh_market_cap(self) -> None:
+        try:
+            market_cap = await self.source.fetch_market_cap()
+            if market_cap:
+                self._market_cap = float(market_cap)
+                self._info_expires_at = time.monotonic() + self.info_ttl
+                return
+        except Exception as e:
+            print(f"Error fetching BTC market cap: {e}")
+        self._info_expires_at = time.monotonic() + self.info_retry
+
+    async def get_bars(self, interval: str) -> BarStore:
+        """Bar store for an interval, after fetching only bars newer than the last one held"""
+        store = self._get_store(interval)
+        now = time.time()
+        last = store.last_timestamp
+        if last is None or now - last >= self.bar_backfill:
+            start = now - self.bar_window
+        else:
+            # Re-request the last bar too: it may still have been forming
+            start = last
+
+        new_bars = store.extend(await self.source.fetch_bars(start, interval))
+        self._update_rolling(interval, new_bars)
+        return store
+
+    def get_rolling_stats(self, interval: str = "1m") -> Optional[RollingOHLCV]:
+        """Rolling window statistics for an interval, or None before its first fetch"""
+        return self._rolling.get(interval)
+
+    def save_bars(self) -> None:
+        """Persist every bar store to bar_cache_dir (if set)"""
+        if not self.bar_cache_dir or not self.source.persistent:
+            return
+        for interval, store in self._bars.items():
+            store.save(self._bar_cache_path(interval))
+
+    def _get_store(self, interval: str) -> BarStore:
+        if interval not in self._bars:
+            store = None
+            if self.bar_cache_dir and self.source.persistent:
+                store = BarStore.load(self._bar_cache_path(interval), self.bar_capacity)
+            self._bars[interval] = store or BarStore(self.bar_capacity)
+            self._rolling[interval] = RollingOHLCV(self.bar_window)
+            last = self._bars[interval].last_timestamp
+            if last is not None:
+                self._update_rolling(interval, self._bars[interval].since(last - self.bar_window))
+        return self._bars[interval]
+
+    def _bar_cache_path(self, interval: str) -> str:
+        return os.path.join(self.bar_cache_dir, f"{self.source.name}_{self.symbol}_{interval}.npy")
+
+    def _update_rolling(self, interval: str, new_bars) -> None:
+        rolling = self._rolling[interval]
+        for bar in new_bars.tolist():
+            rolling.update(*bar)
+
+    async def start(self) -> None:
+        """Start the background refresher that request handlers read from"""
+        self.feed.start()
+
+    async def close(self) -> None:
+        await self.feed.close()
+        if self._info_task is not None and not self._info_task.done():
+            self._info_task.cancel()
+        await self.source.close()
+        try:
+            self.save_bars()
+        except OSError as e:
+            print(f"Error saving BTC bars: {e}")
+
+    def get_snapshot(self) -> Optional[BTCSnapshot]:
+        """Latest published BTC snapshot, or None before the first refresh"""
+        return self.feed.snapshot
+
     async def get_btc_price(self) -> float:
         """Get current BTC price in USD"""
+        snapshot = self.feed.snapshot
+        if snapshot is not None:
+            return snapshot.price
+
         try:
-            loop = asyncio.get_event_loop()
-            btc = await loop.run_in_executor(
-                self.executor, 
-                lambda: yf.Ticker("BTC-USD")
-            )
-            
-            data = await loop.run_in_executor(
-                self.executor, 
-                lambda: btc.history(period="1d", interval="1m")
-            )
-            
-            if not data.empty:
-                current_price = float(data['Close'].iloc[-1])
-                self._last_price = current_price
-                return current_price
-            else:
-                return self._last_price or 95000.0  # Fallback
-                
+            data = await self.fetch_btc_data()
+            return data["price"]
         except Exception as e:
             print(f"Error fetching BTC price: {e}")
             return self._last_price or 95000.0  # Fallback
     
     async def get_btc_data(self) -> Dict[str, Any]:
         """Get comprehensive BTC data"""
+        snapshot = self.feed.snapshot
+        if snapshot is not None:
+            return dict(snapshot.data)
+
         try:
-            loop = asyncio.get_event_loop()
-            btc = await loop.run_in_executor(
-                self.executor, 
-                lambda: yf.Ticker("BTC-USD")
-            )
-            
-            # Get recent data
-            data = await loop.run_in_executor(
-                self.executor, 
-                lambda: btc.history(period="1d", interval="5m")
-            )
-            
-            # Get info
-            info = await loop.run_in_executor(
-                self.executor, 
-                lambda: btc.info
-            )
-            
-            if not data.empty:
-                current_price = float(data['Close'].iloc[-1])
-                previous_close = float(data['Close'].iloc[-2]) if len(data) > 1 else current_price
-                change_24h = current_price - previous_close
-                change_percent = (change_24h / previous_close) * 100 if previous_close else 0
-                
-                volume_24h = float(data['Volume'].iloc[-1])
-                high_24h = float(data['High'].max())
-                low_24h = float(data['Low'].min())
-                
-                result = {
-                    "price": current_price,
-                    "change_24h": change_24h,
-                    "change_percent": change_percent,
-                    "volume_24h": volume_24h,
-                    "high_24h": high_24h,
-                    "low_24h": low_24h,
-                    "market_cap": info.get("marketCap", 0) if info else 0,
-                    "timestamp": data.index[-1].isoformat()
-                }
-                
-                self._last_data = result
-                return result
-            else:
-                return self._last_data or self._get_fallback_data()
-                
+            return await self.fetch_btc_data()
         except Exception as e:
             print(f"Error fetching BTC data: {e}")
             return self._last_data or self._get_fallback_data()
+
+    async def fetch_btc_data(self) -> Dict[str, Any]:
+        """Fetch BTC data from the data source, bypassing the published snapshot"""
+        # Concurrent price and data reads share one bar fetch
+        return await self._single_flight.do("bars", self._fetch_btc_data)
+
+    async def _fetch_btc_data(self) -> Dict[str, Any]:
+        # One 1-minute series serves every view
+        store = await self.get_bars("1m")
+        if not len(store):
+            raise LookupError(f"No bars returned for {self.symbol}")
+        latest = store.latest(1)[0]
+        timestamp = int(latest["timestamp"])
+
+        current_price = float(latest["close"])
+        rolling = self._rolling["1m"]
+        # Change over the same window as the rolling high/low/volume: against the
+        # last close before it began, or its first open if history is shorter
+        previous_close = store.close_before(timestamp - self.bar_window)
+        if previous_close is None:
+            previous_close = rolling.stats().get("open", current_price)
+        change_24h = current_price - previous_close
+        change_percent = (change_24h / previous_close) * 100 if previous_close else 0
+
+        result = {
+            "price": current_price,
+            "change_24h": change_24h,
+            "change_percent": change_percent,
+            "volume_24h": rolling.volume,
+            "high_24h": rolling.high,
+            "low_24h": rolling.low,
+            "vwap_24h": rolling.vwap,
+            "market_cap": self.get_market_cap(),
+            "timestamp": datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+        }
+        
+        self._last_price = current_price
+        self._last_data = result
+        return result
     
     def _get_fallback_data(self) -> Dict[str, Any]:
         """Fallback data when API is unavailable"""
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Dict, Any, Awaitable, Callable, Mapping, Optional
+
+@dataclass(frozen=True)
+class BTCSnapshot:
+    """An immutable, versioned copy of the latest BTC market data"""
+    version: int
+    data: Mapping[str, Any]
+    fetched_at: datetime
+    fetched_mono: float
+
+    @property
+    def price(self) -> float:
+        return self.data["price"]
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_mono
+
+class BTCFeed:
+    """Refreshes BTC market data on a fixed cadence in a background task.
+
+    Each successful refresh publishes a new BTCSnapshot by swapping a single
+    reference, so readers never wait on the upstream and never see a partially
+    updated value. A failed refresh keeps the previous snapshot in place.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[Dict[str, Any]]], interval: float = 30.0):
+        self._fetch = fetch
+        self.interval = interval
+        self._snapshot: Optional[BTCSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._stats = {"refreshes": 0, "failures": 0}
+
+    @property
+    def snapshot(self) -> Optional[BTCSnapshot]:
+        return self._snapshot
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> Optional[BTCSnapshot]:
+        """Wait for the first snapshot (or the timeout) and return the current one"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._snapshot
+
+    async def refresh(self) -> BTCSnapshot:
+        """Fetch once and publish the result as a new snapshot"""
+        data = await self._fetch()
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = BTCSnapshot(
+            version=version,
+            data=MappingProxyType(dict(data)),
+            fetched_at=datetime.now(timezone.utc),
+            fetched_mono=time.monotonic(),
+        )
+        self._stats["refreshes"] += 1
+        self._ready.set()
+        return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            "running": self.running,
+            "interval": self.interval,
+            "version": snapshot.version if snapshot else None,
+            "age": snapshot.age if snapshot else None,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                await self.refresh()
+            except Exception as e:
+                self._stats["failures"] += 1
+                print(f"Error refreshing BTC data: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
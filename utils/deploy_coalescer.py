@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+class DeployCoalescer:
+    """Diffs and coalesces allocation deploys.
+
+    A deploy identical to the last one sent is skipped. A deploy arriving when
+    nothing is in flight and no send happened in the last ``window`` seconds
+    goes upstream at once. Deploys arriving while a send is in flight, or
+    within ``window`` seconds of the last one, are merged so only the latest
+    allocation goes out next; every caller in the burst receives the outcome
+    of that single PUT. Sends are serialized so a later allocation can never
+    be overtaken by an earlier one.
+    """
+
+    def __init__(self, send: Callable[[Dict[str, int]], Awaitable[Dict[str, Any]]], window: float = 0.0):
+        self._send = send
+        self.window = window
+        self.last_deployed: Optional[Dict[str, int]] = None
+        self._last_sent_mono = float("-inf")
+        self._pending: Optional[Dict[str, int]] = None
+        self._pending_seq = 0
+        self._pending_force = False
+        self._batch: Optional[asyncio.Future] = None
+        self._flushes: Dict[asyncio.Future, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+        self._stats = {"sent": 0, "skipped": 0, "merged": 0, "failed": 0}
+
+    async def submit(self, allocation: Dict[str, int], force: bool = False) -> Dict[str, Any]:
+        idle = self._batch is None and not self._send_lock.locked()
+        if not force and idle and allocation == self.last_deployed:
+            self._stats["skipped"] += 1
+            return self._outcome("skipped", allocation, None)
+
+        if self._batch is None:
+            batch = asyncio.get_running_loop().create_future()
+            task = asyncio.ensure_future(self._flush(batch))
+            self._batch = batch
+            self._flushes[batch] = task
+            task.add_done_callback(lambda done: self._flushes.pop(batch, None))
+        batch = self._batch
+        self._pending = allocation
+        self._pending_force = self._pending_force or force
+        self._pending_seq += 1
+        seq = self._pending_seq
+
+        sent_seq, status, response = await asyncio.shield(batch)
+        if seq != sent_seq:
+            status = "merged"
+        self._stats[status] += 1
+        return self._outcome(status, allocation, response)
+
+    def reset(self) -> None:
+        """Forget the last deployed allocation so the next deploy is always sent"""
+        self.last_deployed = None
+
+    async def close(self) -> None:
+        """Cancel pending and in-flight sends, failing their waiters"""
+        flushes = list(self._flushes.items())
+        for _, task in flushes:
+            task.cancel()
+        for batch, task in flushes:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            if not batch.done():
+                batch.set_exception(RuntimeError("Deploy cancelled: client is closing"))
+        self._batch = None
+        self._pending = None
+        self._pending_force = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "window": self.window, "last_deployed": self.last_deployed}
+
+    async def _flush(self, batch: asyncio.Future) -> None:
+        # Only a deploy following a recent send waits; an isolated one goes out at once
+        delay = self._last_sent_mono + self.window - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with self._send_lock:
+            allocation, seq, force = self._pending, self._pending_seq, self._pending_force
+            self._pending = None
+            self._pending_force = False
+            self._batch = None
+            try:
+                if not force and allocation == self.last_deployed:
+                    batch.set_result((seq, "skipped", None))
+                    return
+                self._last_sent_mono = time.monotonic()
+                response = await self._send(allocation)
+                self.last_deployed = allocation
+                batch.set_result((seq, "sent", response))
+            except Exception as e:
+                self._stats["failed"] += 1
+                self.last_deployed = None
+                batch.set_exception(e)
+
+    def _outcome(self, status: str, allocation: Dict[str, int], response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "status": status,
+            "allocation": allocation,
+            "deployed_allocation": self.last_deployed,
+            "response": response,
+        }
@@ -0,0 +1,83 @@
+import numpy as np
+from typing import Dict, Any, Sequence, Union
+
+from utils.inventory import ALLOCATION_KEYS, InventoryCatalog
+
+Allocations = Union[Dict[str, int], Sequence[Dict[str, int]], np.ndarray]
+Prices = Union[Dict[str, Any], Sequence[Dict[str, Any]], np.ndarray]
+
+class EconomicsKernel:
+    """Allocation economics compiled from inventory into per-machine-type vectors.
+
+    Allocations are rows of counts in ``ALLOCATION_KEYS`` order and price rows
+    are ``(energy_price, hash_price, token_price)``. Scoring N allocations
+    against M price rows is a pair of matrix products yielding (N, M) arrays,
+    so whole candidate batches are evaluated in one NumPy call.
+    """
+
+    def __init__(self, catalog: InventoryCatalog):
+        self.keys = ALLOCATION_KEYS
+        machines = [catalog.get(key) for key in self.keys]
+        self.power = np.array([m.power for m in machines], dtype=np.float64)
+        self.hashrate = np.array([m.hashrate for m in machines], dtype=np.float64)
+        self.tokens = np.array([m.tokens for m in machines], dtype=np.float64)
+        self.is_inference = np.array([m.is_inference for m in machines], dtype=bool)
+
+    @classmethod
+    def from_inventory(cls, inventory: Dict[str, Any]) -> "EconomicsKernel":
+        return cls(InventoryCatalog.from_dict(inventory))
+
+    def allocation_matrix(self, allocations: Allocations) -> np.ndarray:
+        """Normalize one or many allocations to an (N, 5) float array"""
+        if isinstance(allocations, np.ndarray):
+            return np.atleast_2d(allocations).astype(np.float64, copy=False)
+        if isinstance(allocations, dict):
+            allocations = [allocations]
+        return np.array(
+            [[a.get(key, 0) for key in self.keys] for a in allocations],
+            dtype=np.float64
+        ).reshape(-1, len(self.keys))
+
+    @staticmethod
+    def price_matrix(prices: Prices) -> np.ndarray:
+        """Normalize one or many /prices rows to an (M, 3) array of energy, hash, token prices"""
+        if isinstance(prices, np.ndarray):
+            return np.atleast_2d(prices).astype(np.float64, copy=False)
+        if isinstance(prices, dict):
+            prices = [prices]
+        return np.array(
+            [[p.get("energy_price", 0), p.get("hash_price", 0), p.get("token_price", 0)] for p in prices],
+            dtype=np.float64
+        ).reshape(-1, 3)
+
+    def power_usage(self, allocations: Allocations) -> np.ndarray:
+        """Total power per allocation, shape (N,)"""
+        return self.allocation_matrix(allocations) @ self.power
+
+    def revenue(self, allocations: Allocations, prices: Prices) -> Dict[str, np.ndarray]:
+        """Mining, inference and total revenue per allocation and price row, each (N, M)"""
+        matrix = self.allocation_matrix(allocations)
+        price_rows = self.price_matrix(prices)
+        mining = np.outer(matrix @ self.hashrate, price_rows[:, 1])
+        inference = np.outer(matrix @ self.tokens, price_rows[:, 2])
+        return {"total": mining + inference, "mining": mining, "inference": inference}
+
+    def energy_cost(self, allocations: Allocations, prices: Prices) -> np.ndarray:
+        """Energy cost per allocation and price row, shape (N, M)"""
+        return np.outer(self.power_usage(allocations), self.price_matrix(prices)[:, 0])
+
+    def profit(self, allocations: Allocations, prices: Prices) -> np.ndarray:
+        """Revenue minus energy cost per allocation and price row, shape (N, M)"""
+        return self.revenue(allocations, prices)["total"] - self.energy_cost(allocations, prices)
+
+    def unit_profit(self, prices: Prices) -> np.ndarray:
+        """Profit of a single machine of each type per price row, shape (M, 5)"""
+        price_rows = self.price_matrix(prices)
+        return (
+            np.outer(price_rows[:, 1], self.hashrate)
+            + np.outer(price_rows[:, 2], self.tokens)
+            - np.outer(price_rows[:, 0], self.power)
+        )
+
+    def to_allocation(self, row: Sequence[float]) -> Dict[str, int]:
+        return {key: int(count) for key, count in zip(self.keys, row)}
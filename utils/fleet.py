@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+import httpx
+
+from utils.mara_client import MaraClient
+
+@dataclass(frozen=True)
+class SiteResult:
+    """Outcome of one per-site operation in a fleet-wide call"""
+    site: str
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "value": self.value,
+            "error": self.error,
+            "elapsed": self.elapsed,
+        }
+
+class FleetManager:
+    """Manages many MARA sites over one shared HTTP connection pool.
+
+    Each site gets its own MaraClient (and so its own caches, breakers and rate
+    limiter), but all of them reuse a single pooled ``httpx.AsyncClient``.
+    Prices are the same for every site, so fleet-wide calls fetch them once
+    through the first site's client and fan out only per-site reads.
+    Fleet-wide calls run concurrently under a semaphore and never raise for a
+    single site: every site gets a SiteResult, failed or not.
+    """
+
+    def __init__(
+        self,
+        sites: Dict[str, str],
+        base_url: str = "https://mara-hackathon-api.onrender.com",
+        max_concurrency: int = 8,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        http2: bool = True,
+        **client_kwargs
+    ):
+        if not sites:
+            raise ValueError("A fleet needs at least one site")
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            http2=http2,
+        )
+        self.clients: Dict[str, MaraClient] = {
+            name: MaraClient(api_key, base_url=base_url, http_client=self._http, **client_kwargs)
+            for name, api_key in sites.items()
+        }
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional["FleetManager"]:
+        """Build a fleet from MARA_SITES ("name=api_key,name2=api_key2"), or None if unset"""
+        raw = os.getenv("MARA_SITES", "").strip()
+        if not raw:
+            return None
+        sites = {}
+        for entry in raw.split(","):
+            name, _, api_key = entry.strip().partition("=")
+            if not name or not api_key:
+                raise ValueError(f"Invalid MARA_SITES entry: '{entry}'")
+            sites[name] = api_key
+        return cls(sites, **kwargs)
+
+    @property
+    def sites(self):
+        return list(self.clients)
+
+    @property
+    def price_client(self) -> MaraClient:
+        """The client whose price cache serves the whole fleet"""
+        return next(iter(self.clients.values()))
+
+    async def close(self) -> None:
+        await asyncio.gather(*[client.close() for client in self.clients.values()])
+        await self._http.aclose()
+
+    async def get_status_all(self) -> Dict[str, SiteResult]:
+        """Site status for every site, with the latest prices fetched once for the fleet"""
+        async def fetch(client: MaraClient) -> Dict[str, Any]:
+            snapshot = await client.get_snapshot(parts=("site_status",))
+            return {"site_status": snapshot.site_status, "freshness": snapshot.freshness()}
+
+        prices_snapshot, results = await asyncio.gather(
+            self.price_client.get_snapshot(parts=("prices",)),
+            self._run_all(self.clients, fetch)
+        )
+        prices = prices_snapshot.part("prices")
+        current_prices = list(prices.value[:1]) if prices.ok else None
+        return {
+            site: replace(result, value={
+                **result.value,
+                "current_prices": current_prices,
+                "freshness": {**result.value["freshness"], "prices": prices.freshness()},
+            }) if result.ok else result
+            for site, result in results.items()
+        }
+
+    async def get_prices_all(self) -> Dict[str, SiteResult]:
+        """Latest prices, fetched once and reported for every site"""
+        result = await self._run("prices", self.price_client.get_current_prices)
+        return {site: replace(result, site=site) for site in self.clients}
+
+    async def deploy_all(self, allocations: Dict[str, Dict[str, int]]) -> Dict[str, SiteResult]:
+        """Deploy per-site allocations in parallel; unknown sites fail individually"""
+        targets = {name: self.clients.get(name) for name in allocations}
+
+        async def deploy(name: str, client: Optional[MaraClient]) -> SiteResult:
+            if client is None:
+                return SiteResult(site=name, ok=False, error=f"Unknown site '{name}'")
+            return await self._run(name, lambda: client.update_allocation(allocations[name]))
+
+        results = await asyncio.gather(*[deploy(name, client) for name, client in targets.items()])
+        return {result.site: result for result in results}
+
+    async def _run_all(
+        self,
+        clients: Dict[str, MaraClient],
+        fn: Callable[[MaraClient], Awaitable[Any]]
+    ) -> Dict[str, SiteResult]:
+        results = await asyncio.gather(*[
+            self._run(name, lambda client=client: fn(client)) for name, client in clients.items()
+        ])
+        return {result.site: result for result in results}
+
+    async def _run(self, site: str, fn: Callable[[], Awaitable[Any]]) -> SiteResult:
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                value = await fn()
+                return SiteResult(site=site, ok=True, value=value, elapsed=time.monotonic() - started)
+            except Exception as e:
+                return SiteResult(site=site, ok=False, error=str(e), elapsed=time.monotonic() - started)
@@ -0,0 +1,90 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+# (allocation key, inventory category, inventory name) for every machine type
+MACHINE_TYPES: Tuple[Tuple[str, str, str], ...] = (
+    ("air_miners", "miners", "air"),
+    ("hydro_miners", "miners", "hydro"),
+    ("immersion_miners", "miners", "immersion"),
+    ("gpu_compute", "inference", "gpu"),
+    ("asic_compute", "inference", "asic"),
+)
+
+ALLOCATION_KEYS: Tuple[str, ...] = tuple(key for key, _, _ in MACHINE_TYPES)
+
+@dataclass(frozen=True)
+class MachineSpec:
+    """Static specification of one machine type"""
+    key: str
+    category: str
+    name: str
+    power: int
+    hashrate: int = 0
+    tokens: int = 0
+
+    @property
+    def is_inference(self) -> bool:
+        return self.category == "inference"
+
+@dataclass(frozen=True)
+class InventoryCatalog:
+    """Immutable view of the MARA /inventory payload"""
+    machines: Tuple[MachineSpec, ...]
+    fetched_at: str
+
+    @classmethod
+    def from_dict(cls, inventory: Dict[str, Any], fetched_at: Optional[str] = None) -> "InventoryCatalog":
+        machines = []
+        for key, category, name in MACHINE_TYPES:
+            spec = inventory.get(category, {}).get(name, {})
+            machines.append(MachineSpec(
+                key=key,
+                category=category,
+                name=name,
+                power=spec.get("power", 0),
+                hashrate=spec.get("hashrate", 0),
+                tokens=spec.get("tokens", 0),
+            ))
+        return cls(
+            machines=tuple(machines),
+            fetched_at=fetched_at or datetime.now(timezone.utc).isoformat(),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Rebuild the raw /inventory shape expected by existing callers"""
+        inventory: Dict[str, Any] = {"inference": {}, "miners": {}}
+        for machine in self.machines:
+            if machine.is_inference:
+                inventory["inference"][machine.name] = {"power": machine.power, "tokens": machine.tokens}
+            else:
+                inventory["miners"][machine.name] = {"hashrate": machine.hashrate, "power": machine.power}
+        return inventory
+
+    def get(self, key: str) -> MachineSpec:
+        for machine in self.machines:
+            if machine.key == key:
+                return machine
+        raise KeyError(key)
+
+    def save(self, path: str) -> None:
+        """Atomically persist the catalog as JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": self.fetched_at, "inventory": self.to_dict()}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["InventoryCatalog"]:
+        """Load a persisted catalog, returning None if it is missing or unreadable"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls.from_dict(data["inventory"], fetched_at=data.get("fetched_at"))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
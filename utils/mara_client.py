@@ -1,36 +1,354 @@
 import httpx
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Awaitable, Callable, Optional, Sequence
 import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils.price_cache import PriceCache, parse_http_date
+from utils.inventory import InventoryCatalog
+from utils.single_flight import SingleFlight
+from utils.price_history import PriceHistory, to_epoch
+from utils.price_store import PriceStore
+from utils.price_stream import read_price_stream
+from utils.economics import EconomicsKernel
+from utils.deploy_coalescer import DeployCoalescer
+from utils.status_provider import SiteStatusProvider, StatusReading
+from utils.resilience import Resilience, ResilienceConfig, is_upstream_failure
+from utils.rate_limiter import Lane, LaneTicket, PriorityRateLimiter, current_lane, current_ticket
+from utils.snapshot import MaraSnapshot, SnapshotPart, SNAPSHOT_PARTS
 
 class MaraClient:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://mara-hackathon-api.onrender.com",
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        price_tick_interval: float = 300.0,
+        inventory_cache_path: Optional[str] = None,
+        snapshot_timeout: float = 10.0,
+        price_history_capacity: int = 4096,
+        price_store: Optional[PriceStore] = None,
+        status_soft_ttl: float = 15.0,
+        status_hard_ttl: float = 120.0,
+        deploy_coalesce_window: float = 0.0,
+        resilience: Optional[ResilienceConfig] = None,
+        price_fetch_limit: Optional[int] = None,
+        rate_limit: float = 20.0,
+        rate_burst: int = 40,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
         self.api_key = api_key
-        self.base_url = "https://mara-hackathon-api.onrender.com"
+        self.base_url = base_url
         self.headers = {"X-Api-Key": api_key}
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        # A client passed in (e.g. by FleetManager) is shared and owned by the caller
+        self._client: Optional[httpx.AsyncClient] = http_client
+        self._owns_client = http_client is None
+        self.resilience = Resilience(resilience)
+        self.rate_limiter = PriorityRateLimiter(rate=rate_limit, burst=rate_burst)
+        self.price_cache = PriceCache(tick_interval=price_tick_interval)
+        self.price_history = PriceHistory(capacity=price_history_capacity)
+        self.price_store = price_store
+        self.price_fetch_limit = price_fetch_limit
+        self._prices_view: Optional[List[Dict[str, Any]]] = None
+        self.inventory_cache_path = inventory_cache_path
+        self._inventory: Optional[InventoryCatalog] = None
+        self._single_flight = SingleFlight()
+        self._flight_tickets: Dict[str, LaneTicket] = {}
+        self.site_status = SiteStatusProvider(
+            self._fetch_site_status,
+            soft_ttl=status_soft_ttl,
+            hard_ttl=status_hard_ttl,
+            fallback_on=is_upstream_failure,
+            background_fetch=lambda: self._in_lane(Lane.BACKGROUND, self._fetch_site_status)
+        )
+        self.snapshot_timeout = snapshot_timeout
+        self._kernel: Optional[EconomicsKernel] = None
+        self._kernel_inventory: Optional[Dict[str, Any]] = None
+        self.deployer = DeployCoalescer(self._put_allocation, window=deploy_coalesce_window)
+    
+    async def start(self) -> None:
+        """Open the shared pooled HTTP client (called from the app lifespan)"""
+        if not self._owns_client:
+            return
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                http2=self.http2,
+            )
+    
+    async def close(self) -> None:
+        """Close the shared HTTP client and release pooled connections"""
+        await self.deployer.close()
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+        await self.site_status.close()
+        if self.price_store is not None:
+            self.price_store.close()
+    
+    @contextmanager
+    def priority(self, lane: Lane):
+        """Run the enclosed MARA calls in the given rate-limiter lane"""
+        token = current_lane.set(lane)
+        try:
+            yield
+        finally:
+            current_lane.reset(token)
+    
+    async def _in_lane(self, lane: Lane, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self.priority(lane):
+            return await fn()
+    
+    async def _coalesced(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Single-flight a read; a caller joining from a higher-priority lane promotes it"""
+        lane = current_lane.get()
+        ticket = self._flight_tickets.get(key)
+        if ticket is not None and self._single_flight.in_flight(key):
+            ticket.promote(lane)
+            return await self._single_flight.do(key, fn)
+        
+        ticket = LaneTicket(lane)
+        self._flight_tickets[key] = ticket
+        
+        async def run() -> Any:
+            current_ticket.set(ticket)
+            return await fn()
+        
+        return await self._single_flight.do(key, run)
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Lazily open the pool so the client also works outside the app lifespan
+        if self._owns_client and (self._client is None or self._client.is_closed):
+            await self.start()
+        return self._client
+    
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        reader: Optional[Callable[[httpx.Response], Awaitable[Any]]] = None,
+        lane: Optional[Lane] = None,
+        **kwargs
+    ) -> Any:
+        """Send a request; with a reader the body is streamed to it and its result returned"""
+        endpoint = f"{method} {path}"
+        ticket = current_ticket.get() if lane is None else None
+        lane = current_lane.get() if lane is None else lane
+        # One token per logical request, taken before the timed (and hedged) attempts
+        await self.rate_limiter.acquire(lane, ticket=ticket)
+        
+        async def attempt() -> Any:
+            client = await self._get_client()
+            timeout = self.resilience.timeout_for(endpoint)
+            if reader is None:
+                response = await client.request(method, path, headers=self.headers, timeout=timeout, **kwargs)
+                response.raise_for_status()
+                return response
+            async with client.stream(method, path, headers=self.headers, timeout=timeout, **kwargs) as response:
+                response.raise_for_status()
+                return await reader(response)
+        
+        # Only reads are hedged and retried; a deploy is attempted once
+        return await self.resilience.call(endpoint, attempt, idempotent=method == "GET")
+    
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        response = await self._send(method, path, **kwargs)
+        return response.json()
     
     async def get_current_prices(self) -> List[Dict[str, Any]]:
-        """Get current pricing data from MARA API"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/prices", headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        """Get current pricing data (newest first, up to the history capacity),
+        served from cache until the next price tick"""
+        cached = self.price_cache.get()
+        if cached is not None:
+            return cached
+        try:
+            return await self._coalesced("/prices", self._fetch_prices)
+        except Exception as e:
+            stale = self.price_cache.peek()
+            if stale is None or not is_upstream_failure(e):
+                raise
+            print(f"Serving cached prices, upstream unavailable: {e}")
+            return stale
+    
+    async def _fetch_prices(self) -> List[Dict[str, Any]]:
+        # Stream-decode only the rows newer than what the history already holds
+        last = self.price_history.last_timestamp
+        result = await self._read_prices(stop_after=last)
+        if last is not None and result.newest is not None and result.newest < last:
+            # The upstream is behind our history (it was reset, or the stored ticks came
+            # from elsewhere); newer local ticks would hide its rows forever, so start over
+            print("Upstream prices end before the local history; resetting it")
+            self.price_history.clear()
+            self._prices_view = None
+            if self.price_store is not None:
+                await asyncio.to_thread(self.price_store.truncate_after, result.newest)
+            result = await self._read_prices(stop_after=None)
+        appended = self.price_history.ingest(result.rows)
+        if appended or self._prices_view is None:
+            self._prices_view = self.price_history.latest()
+        self.price_cache.set(self._prices_view, server_time=parse_http_date(result.date))
+        
+        if appended and self.price_store is not None:
+            # New rows may exceed the ring buffer capacity on a cold start
+            try:
+                await asyncio.to_thread(self.price_store.append, result.rows)
+            except Exception as e:
+                print(f"Error persisting price ticks: {e}")
+        return self._prices_view
+    
+    async def _read_prices(self, stop_after: Optional[float]) -> Any:
+        return await self._send(
+            "GET",
+            "/prices",
+            reader=lambda response: read_price_stream(
+                response,
+                max_rows=self.price_fetch_limit,
+                stop_after=stop_after
+            )
+        )
+    
+    async def load_price_history(self) -> int:
+        """Warm the in-memory price history from the durable store"""
+        if self.price_store is None:
+            return 0
+        rows = await asyncio.to_thread(self.price_store.latest, self.price_history.capacity)
+        return self.price_history.ingest(rows)
+    
+    async def get_price_range(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get stored price ticks between two ISO timestamps, oldest first"""
+        if self.price_store is None:
+            raise RuntimeError("No price store configured")
+        return await asyncio.to_thread(
+            self.price_store.range,
+            to_epoch(start) if start else None,
+            to_epoch(end) if end else None,
+            limit
+        )
+    
+    async def get_recent_prices(self, n: int) -> List[Dict[str, Any]]:
+        """Get the n most recent price ticks (newest first) from the in-memory history"""
+        await self.get_current_prices()
+        return self.price_history.latest(n)
+    
+    def invalidate_prices(self) -> None:
+        """Force the next get_current_prices call to go upstream"""
+        self.price_cache.invalidate()
+    
+    async def load_inventory(self) -> InventoryCatalog:
+        """Load the inventory catalog from the local cache file, fetching it only if absent"""
+        if self._inventory is None and self.inventory_cache_path:
+            self._inventory = InventoryCatalog.load(self.inventory_cache_path)
+        if self._inventory is None:
+            await self.refresh_inventory()
+        return self._inventory
+    
+    async def refresh_inventory(self) -> InventoryCatalog:
+        """Re-fetch inventory from MARA API and persist it locally"""
+        return await self._coalesced("/inventory", self._fetch_inventory)
+    
+    async def _fetch_inventory(self) -> InventoryCatalog:
+        catalog = InventoryCatalog.from_dict(await self._request("GET", "/inventory"))
+        if self.inventory_cache_path:
+            try:
+                catalog.save(self.inventory_cache_path)
+            except OSError as e:
+                print(f"Error persisting inventory catalog: {e}")
+        self._inventory = catalog
+        return catalog
+    
+    async def get_inventory_catalog(self) -> InventoryCatalog:
+        """Get the static inventory as an immutable catalog"""
+        if self._inventory is not None:
+            return self._inventory
+        return await self.load_inventory()
     
     async def get_inventory(self) -> Dict[str, Any]:
-        """Get available inventory from MARA API"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/inventory", headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        """Get available inventory (static, so served from the local catalog)"""
+        catalog = await self.get_inventory_catalog()
+        return catalog.to_dict()
+    
+    async def _fetch_site_status(self) -> Dict[str, Any]:
+        return await self._coalesced("/machines", lambda: self._request("GET", "/machines"))
     
     async def get_site_status(self) -> Dict[str, Any]:
-        """Get current site status and allocation"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/machines", headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-    
-    async def update_allocation(self, allocation: Dict[str, int]) -> Dict[str, Any]:
-        """Update machine allocation on MARA"""
+        """Get current site status and allocation (stale-while-revalidate)"""
+        reading = await self.site_status.get()
+        return reading.value
+    
+    async def get_site_status_reading(self) -> StatusReading:
+        """Get current site status tagged with its age"""
+        return await self.site_status.get()
+    
+    async def get_snapshot(
+        self,
+        parts: Sequence[str] = SNAPSHOT_PARTS,
+        timeouts: Optional[Dict[str, float]] = None
+    ) -> MaraSnapshot:
+        """Fetch prices, inventory and/or site status concurrently, each under its own timeout"""
+        unknown = set(parts) - set(SNAPSHOT_PARTS)
+        if unknown:
+            raise ValueError(f"Unknown snapshot parts: {sorted(unknown)}")
+        
+        timeouts = timeouts or {}
+        names = list(dict.fromkeys(parts))
+        results = await asyncio.gather(*[
+            self._fetch_snapshot_part(name, timeouts.get(name, self.snapshot_timeout))
+            for name in names
+        ])
+        return MaraSnapshot(
+            taken_at=datetime.now(timezone.utc).isoformat(),
+            parts={part.name: part for part in results}
+        )
+    
+    async def _fetch_snapshot_part(self, name: str, timeout: float) -> SnapshotPart:
+        try:
+            if name == "prices":
+                value = tuple(await asyncio.wait_for(self.get_current_prices(), timeout))
+                fetched_at = self.price_cache.fetched_at
+            elif name == "inventory":
+                catalog = await asyncio.wait_for(self.get_inventory_catalog(), timeout)
+                value = catalog.to_dict()
+                fetched_at = datetime.fromisoformat(catalog.fetched_at)
+            else:
+                reading = await asyncio.wait_for(self.get_site_status_reading(), timeout)
+                value = reading.value
+                fetched_at = reading.fetched_at
+        except asyncio.TimeoutError:
+            return SnapshotPart(name=name, error=TimeoutError(f"Timed out fetching {name} after {timeout}s"))
+        except Exception as e:
+            return SnapshotPart(name=name, error=e)
+        
+        age = None
+        if fetched_at is not None:
+            age = max(0.0, (datetime.now(timezone.utc) - fetched_at).total_seconds())
+        return SnapshotPart(
+            name=name,
+            value=value,
+            fetched_at=fetched_at.isoformat() if fetched_at else None,
+            age=age
+        )
+    
+    async def update_allocation(self, allocation: Dict[str, int], force: bool = False) -> Dict[str, Any]:
+        """Update machine allocation on MARA, skipping no-op and merging bursty deploys.
+        
+        Returns the deploy status ("sent", "skipped" or "merged"), the requested
+        and currently deployed allocations, and the upstream response if a PUT was made.
+        """
         # Map our internal names to MARA API names
         mara_allocation = {
             "air_miners": allocation.get("air_miners", 0),
@@ -40,76 +358,62 @@ class MaraClient:
             "asic_compute": allocation.get("asic_compute", 0),
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{self.base_url}/machines",
-                headers=self.headers,
-                json=mara_allocation
-            )
-            response.raise_for_status()
-            return response.json()
+        return await self.deployer.submit(mara_allocation, force=force)
+    
+    async def _put_allocation(self, mara_allocation: Dict[str, int]) -> Dict[str, Any]:
+        result = await self._request("PUT", "/machines", lane=Lane.DEPLOY, json=mara_allocation)
+        # Reads joining a /machines fetch that predates the deploy would see the old allocation
+        self._single_flight.forget("/machines")
+        self.site_status.invalidate()
+        return result
+    
+    def get_upstream_health(self) -> Dict[str, Any]:
+        """Per-endpoint circuit breaker state, latency percentiles and retry/hedge counts"""
+        return self.resilience.state()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Client-side cache and traffic metrics"""
+        return {
+            "price_cache": self.price_cache.stats(),
+            "single_flight": self._single_flight.stats(),
+            "site_status": self.site_status.stats(),
+            "deploys": self.deployer.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "price_history": {
+                "size": len(self.price_history),
+                "capacity": self.price_history.capacity,
+            },
+            "price_store": {
+                "path": self.price_store.path,
+                "ticks": self.price_store.count(),
+            } if self.price_store is not None else None,
+        }
+    
+    def economics(self, inventory: Dict[str, Any]) -> EconomicsKernel:
+        """Get the economics kernel for an inventory, compiling it only when the inventory changes"""
+        if self._kernel is None or self._kernel_inventory != inventory:
+            self._kernel = EconomicsKernel.from_inventory(inventory)
+            self._kernel_inventory = inventory
+        return self._kernel
     
     def calculate_power_usage(self, allocation: Dict[str, int], inventory: Dict[str, Any]) -> int:
         """Calculate total power usage for an allocation"""
-        power_usage = 0
-        
-        # Mining power usage
-        miners = inventory.get("miners", {})
-        power_usage += allocation.get("air_miners", 0) * miners.get("air", {}).get("power", 0)
-        power_usage += allocation.get("hydro_miners", 0) * miners.get("hydro", {}).get("power", 0)
-        power_usage += allocation.get("immersion_miners", 0) * miners.get("immersion", {}).get("power", 0)
-        
-        # Inference power usage
-        inference = inventory.get("inference", {})
-        power_usage += allocation.get("gpu_compute", 0) * inference.get("gpu", {}).get("power", 0)
-        power_usage += allocation.get("asic_compute", 0) * inference.get("asic", {}).get("power", 0)
-        
-        return power_usage
+        return int(self.economics(inventory).power_usage(allocation)[0])
     
     def calculate_expected_revenue(
         self, 
         allocation: Dict[str, int], 
         inventory: Dict[str, Any], 
-        prices: List[Dict[str, Any]]
+        prices: List[Dict[str, Any]],
+        price_index: int = 0
     ) -> Dict[str, float]:
-        """Calculate expected revenue for an allocation"""
+        """Calculate expected revenue for an allocation (latest prices by default)"""
         if not prices:
             return {"total": 0.0, "mining": 0.0, "inference": 0.0}
         
-        # Use latest prices
-        latest_prices = prices[0]
-        
-        mining_revenue = 0.0
-        inference_revenue = 0.0
-        
-        # Mining revenue (hashrate * hash_price)
-        miners = inventory.get("miners", {})
-        mining_revenue += (
-            allocation.get("air_miners", 0) * miners.get("air", {}).get("hashrate", 0) * 
-            latest_prices.get("hash_price", 0)
-        )
-        mining_revenue += (
-            allocation.get("hydro_miners", 0) * miners.get("hydro", {}).get("hashrate", 0) * 
-            latest_prices.get("hash_price", 0)
-        )
-        mining_revenue += (
-            allocation.get("immersion_miners", 0) * miners.get("immersion", {}).get("hashrate", 0) * 
-            latest_prices.get("hash_price", 0)
-        )
-        
-        # Inference revenue (tokens * token_price)
-        inference = inventory.get("inference", {})
-        inference_revenue += (
-            allocation.get("gpu_compute", 0) * inference.get("gpu", {}).get("tokens", 0) * 
-            latest_prices.get("token_price", 0)
-        )
-        inference_revenue += (
-            allocation.get("asic_compute", 0) * inference.get("asic", {}).get("tokens", 0) * 
-            latest_prices.get("token_price", 0)
-        )
-        
+        revenue = self.economics(inventory).revenue(allocation, prices[price_index])
         return {
-            "total": mining_revenue + inference_revenue,
-            "mining": mining_revenue,
-            "inference": inference_revenue
+            "total": float(revenue["total"][0, 0]),
+            "mining": float(revenue["mining"][0, 0]),
+            "inference": float(revenue["inference"][0, 0])
         }
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""Local stand-in for the MARA hackathon API, for offline load and latency testing.
+
+Run with ``python -m utils.mara_simulator --speed 60 --latency-ms 80`` and point
+MaraClient at it via ``MARA_API_BASE_URL=http://127.0.0.1:8100`` (and
+``MARA_PRICE_TICK_SECONDS`` set to ``300 / speed`` so the price cache follows the
+accelerated ticks). It also serves BTC bars in Yahoo's v8 chart format, replayed
+from the BTC CSV on the same clock; set ``BTC_CHART_URL`` to the simulator to use
+them.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from utils.market_data import CSVReplaySource, DEFAULT_REPLAY_CSV, chart_payload
+
+DEFAULT_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "web", "analyticsdata", "simulated_inference_data_60d.csv"
+)
+
+INVENTORY = {
+    "inference": {
+        "asic": {"power": 15000, "tokens": 50000},
+        "gpu": {"power": 5000, "tokens": 1000},
+    },
+    "miners": {
+        "air": {"hashrate": 1000, "power": 3500},
+        "hydro": {"hashrate": 5000, "power": 5000},
+        "immersion": {"hashrate": 10000, "power": 10000},
+    },
+}
+
+# allocation key -> (inventory category, inventory name, output field)
+MACHINES = {
+    "air_miners": ("miners", "air", "hashrate"),
+    "hydro_miners": ("miners", "hydro", "hashrate"),
+    "immersion_miners": ("miners", "immersion", "hashrate"),
+    "gpu_compute": ("inference", "gpu", "tokens"),
+    "asic_compute": ("inference", "asic", "tokens"),
+}
+
+@dataclass
+class SimulatorConfig:
+    csv_path: str = DEFAULT_CSV
+    btc_csv_path: str = DEFAULT_REPLAY_CSV
+    speed: float = 1.0
+    history: int = 288
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    site_power: int = 1000000
+    api_key: str = "sim-key"
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "SimulatorConfig":
+        seed = os.getenv("SIM_SEED")
+        return cls(
+            csv_path=os.getenv("SIM_CSV", DEFAULT_CSV),
+            btc_csv_path=os.getenv("SIM_BTC_CSV", DEFAULT_REPLAY_CSV),
+            speed=float(os.getenv("SIM_SPEED", "1")),
+            history=int(os.getenv("SIM_HISTORY", "288")),
+            latency_ms=float(os.getenv("SIM_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("SIM_JITTER_MS", "0")),
+            error_rate=float(os.getenv("SIM_ERROR_RATE", "0")),
+            site_power=int(os.getenv("SIM_SITE_POWER", "1000000")),
+            api_key=os.getenv("SIM_API_KEY", "sim-key"),
+            seed=int(seed) if seed else None,
+        )
+
+@dataclass
+class Site:
+    name: str
+    api_key: str
+    power: int
+    id: int
+    allocation: Dict[str, int] = field(default_factory=lambda: {key: 0 for key in MACHINES})
+    allocation_id: int = 0
+    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+class PriceClock:
+    """Replays CSV price rows as 5-minute ticks on an accelerated clock.
+
+    One tick is published every ``300 / speed`` real seconds and is stamped with
+    real (UTC) time, so tick spacing in the payload matches what a client sees.
+    ``history`` ticks are back-filled at start-up.
+    """
+
+    def __init__(self, rows: List[Dict[str, float]], speed: float, history: int):
+        if not rows:
+            raise ValueError("Price replay needs at least one CSV row")
+        self.rows = rows
+        self.tick_seconds = 300.0 / speed
+        self.history = max(1, history)
+        self.started_at = time.time()
+
+    @classmethod
+    def from_csv(cls, path: str, speed: float, history: int) -> "PriceClock":
+        with open(path, newline="") as f:
+            rows = [
+                {
+                    "energy_price": float(row["energy_price"]),
+                    "hash_price": float(row["hash_price"]),
+                    "token_price": float(row["token_price"]),
+                }
+                for row in csv.DictReader(f)
+            ]
+        return cls(rows, speed, history)
+
+    def current_tick(self) -> int:
+        return self.history - 1 + int((time.time() - self.started_at) // self.tick_seconds)
+
+    def tick(self, k: int) -> Dict[str, Any]:
+        seconds = self.started_at + (k - (self.history - 1)) * self.tick_seconds
+        stamp = datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None, microsecond=0)
+        return {**self.rows[k % len(self.rows)], "timestamp": stamp.isoformat()}
+
+    def prices(self) -> List[Dict[str, Any]]:
+        """All published ticks, newest first"""
+        return [self.tick(k) for k in range(self.current_tick(), -1, -1)]
+
+class CreateSite(BaseModel):
+    name: str
+
+def create_app(config: Optional[SimulatorConfig] = None) -> FastAPI:
+    config = config or SimulatorConfig.from_env()
+    rng = random.Random(config.seed)
+    clock = PriceClock.from_csv(config.csv_path, config.speed, config.history)
+    btc = CSVReplaySource.from_csv(config.btc_csv_path, speed=config.speed)
+    sites: Dict[str, Site] = {}
+    stats = {"requests": 0, "injected_errors": 0}
+
+    def add_site(name: str, api_key: str) -> Site:
+        site = Site(name=name, api_key=api_key, power=config.site_power, id=len(sites))
+        sites[api_key] = site
+        return site
+
+    add_site("SimulatorSite", config.api_key)
+
+    app = FastAPI(title="MARA API Simulator")
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        stats["requests"] += 1
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["injected_errors"] += 1
+            return JSONResponse({"detail": "Injected upstream error"}, status_code=503)
+        return await call_next(request)
+
+    def require_site(api_key: Optional[str]) -> Site:
+        site = sites.get(api_key or "")
+        if site is None:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        return site
+
+    def machine_status(site: Site) -> Dict[str, Any]:
+        latest = clock.tick(clock.current_tick())
+        power, revenue = {}, {}
+        for key, (category, name, output) in MACHINES.items():
+            spec = INVENTORY[category][name]
+            count = site.allocation[key]
+            price = latest["hash_price"] if output == "hashrate" else latest["token_price"]
+            power[key] = count * spec["power"]
+            revenue[key] = count * spec[output] * price
+        total_power = sum(power.values())
+        return {
+            **site.allocation,
+            "id": site.allocation_id,
+            "site_id": site.id,
+            "power": power,
+            "revenue": revenue,
+            "total_power_used": total_power,
+            "total_power_cost": total_power * latest["energy_price"],
+            "total_revenue": sum(revenue.values()),
+            "updated_at": site.updated_at,
+        }
+
+    @app.post("/sites")
+    async def create_site(body: CreateSite):
+        site = add_site(body.name, str(uuid.uuid4()))
+        return {"api_key": site.api_key, "name": site.name, "power": site.power}
+
+    @app.get("/sites")
+    async def get_site(x_api_key: Optional[str] = Header(None)):
+        site = require_site(x_api_key)
+        return {"api_key": site.api_key, "name": site.name, "power": site.power}
+
+    @app.get("/prices")
+    async def get_prices():
+        return clock.prices()
+
+    @app.get("/inventory")
+    async def get_inventory():
+        return INVENTORY
+
+    @app.get("/machines")
+    async def get_machines(x_api_key: Optional[str] = Header(None)):
+        return machine_status(require_site(x_api_key))
+
+    @app.put("/machines")
+    async def put_machines(allocation: Dict[str, int], x_api_key: Optional[str] = Header(None)):
+        site = require_site(x_api_key)
+        unknown = set(allocation) - set(MACHINES)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown machine types: {sorted(unknown)}")
+        if any(count < 0 for count in allocation.values()):
+            raise HTTPException(status_code=422, detail="Machine counts must be non-negative")
+
+        proposed = {key: allocation.get(key, 0) for key in MACHINES}
+        power = sum(
+            count * INVENTORY[MACHINES[key][0]][MACHINES[key][1]]["power"]
+            for key, count in proposed.items()
+        )
+        if power > site.power:
+            raise HTTPException(status_code=400, detail=f"Allocation needs {power}W, site limit is {site.power}W")
+
+        site.allocation = proposed
+        site.allocation_id += 1
+        site.updated_at = datetime.utcnow().isoformat()
+        return {**site.allocation, "id": site.allocation_id, "site_id": site.id, "updated_at": site.updated_at}
+
+    @app.get("/v8/finance/chart/{symbol}")
+    async def get_chart(symbol: str, interval: str = "1m", period1: Optional[int] = None):
+        if period1 is None:
+            start = btc.now() - 86400
+        else:
+            start = float(period1)
+        try:
+            bars = btc.bars(start, interval)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return chart_payload(symbol, bars, interval)
+
+    @app.get("/_sim/stats")
+    async def get_stats():
+        return {
+            **stats,
+            "sites": len(sites),
+            "current_tick": clock.current_tick(),
+            "tick_seconds": clock.tick_seconds,
+        }
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local MARA API simulator")
+    defaults = SimulatorConfig.from_env()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--csv", dest="csv_path", default=defaults.csv_path)
+    parser.add_argument("--btc-csv", dest="btc_csv_path", default=defaults.btc_csv_path)
+    parser.add_argument("--speed", type=float, default=defaults.speed, help="Clock acceleration (60 = one tick every 5s)")
+    parser.add_argument("--history", type=int, default=defaults.history, help="Ticks back-filled at start-up")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Fraction of requests answered with 503")
+    parser.add_argument("--site-power", type=int, default=defaults.site_power)
+    parser.add_argument("--api-key", default=defaults.api_key)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = SimulatorConfig(**{k: v for k, v in vars(args).items() if k not in ("host", "port")})
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import asyncio
+import csv
+import os
+import time
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import httpx
+import numpy as np
+
+from utils.bar_store import BAR_DTYPE
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com"
+
+DEFAULT_REPLAY_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "web", "analyticsdata", "btc_60d_yf.csv"
+)
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+INTERVAL_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+def interval_seconds(interval: str) -> int:
+    """Length of a yfinance-style interval ("1m", "5m", "1h", "1d") in seconds"""
+    try:
+        return int(interval[:-1]) * INTERVAL_UNITS[interval[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported interval '{interval}'")
+
+CHART_FIELDS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+
+def parse_chart(payload: Dict[str, Any]) -> np.ndarray:
+    """Parse a Yahoo v8 chart payload into BAR_DTYPE records.
+
+    Bars without a close (gaps Yahoo pads with nulls) are skipped.
+    """
+    chart = payload.get("chart") or {}
+    if chart.get("error"):
+        error = chart["error"]
+        raise LookupError(f"Chart API error: {error.get('description', error) if isinstance(error, dict) else error}")
+
+    columns = {"timestamp": array("d"), **{column: array("d") for column in BAR_COLUMNS}}
+    results = chart.get("result") or []
+    if results:
+        result = results[0]
+        quotes = (result.get("indicators") or {}).get("quote") or [{}]
+        quote = quotes[0]
+        fields = {column: quote.get(name) or [] for column, name in CHART_FIELDS.items()}
+        for i, ts in enumerate(result.get("timestamp") or []):
+            close = fields["Close"][i] if i < len(fields["Close"]) else None
+            if close is None:
+                continue
+            columns["timestamp"].append(ts)
+            for column in ("Open", "High", "Low"):
+                value = fields[column][i] if i < len(fields[column]) else None
+                columns[column].append(close if value is None else value)
+            volume = fields["Volume"][i] if i < len(fields["Volume"]) else None
+            columns["Close"].append(close)
+            columns["Volume"].append(volume or 0.0)
+
+    records = np.empty(len(columns["timestamp"]), dtype=BAR_DTYPE)
+    records["timestamp"] = np.frombuffer(columns["timestamp"], dtype=np.float64)
+    for column, name in CHART_FIELDS.items():
+        records[name] = np.frombuffer(columns[column], dtype=np.float64)
+    return records
+
+def chart_payload(symbol: str, bars: np.ndarray, interval: str) -> Dict[str, Any]:
+    """Render BAR_DTYPE records as a Yahoo v8 chart payload (used by the local simulator)"""
+    return {
+        "chart": {
+            "result": [{
+                "meta": {"symbol": symbol, "dataGranularity": interval, "currency": "USD"},
+                "timestamp": bars["timestamp"].tolist(),
+                "indicators": {"quote": [{
+                    name: bars[name].tolist() for name in CHART_FIELDS.values()
+                }]},
+            }],
+            "error": None,
+        }
+    }
+
+class MarketDataSource(ABC):
+    """Where BTCClient gets OHLCV bars and fundamentals from.
+
+    ``fetch_bars`` returns time-ordered BAR_DTYPE records holding every bar
+    that starts at or after ``start`` (epoch seconds).
+    """
+
+    name = "base"
+    # Whether fetched bars are real history worth persisting across restarts
+    persistent = True
+
+    @abstractmethod
+    async def fetch_bars(self, start: float, interval: str) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    async def fetch_market_cap(self) -> Optional[float]:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+class YahooChartSource(MarketDataSource):
+    """Bars straight from Yahoo's v8 chart API over a pooled async HTTP client.
+
+    No threads are involved; any number of fetches can be in flight. If a
+    fetch fails and a ``fallback`` source is set (normally yfinance), the
+    fallback serves it instead. The chart API carries no fundamentals, so
+    market cap always comes from the fallback.
+    """
+
+    name = "yahoo-chart"
+
+    def __init__(
+        self,
+        symbol: str = "BTC-USD",
+        base_url: str = YAHOO_CHART_URL,
+        timeout: float = 10.0,
+        max_connections: int = 10,
+        fallback: Optional[MarketDataSource] = None
+    ):
+        self.symbol = symbol
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.fallback = fallback
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats = {"requests": 0, "failures": 0, "fallbacks": 0}
+
+    async def fetch_chart(self, start: float, interval: str) -> np.ndarray:
+        """Fetch bars starting at or after ``start`` as BAR_DTYPE records"""
+        client = self._get_client()
+        params = {
+            "interval": interval,
+            "period1": int(start),
+            "period2": int(time.time()) + interval_seconds(interval),
+            "includePrePost": "false",
+        }
+        self._stats["requests"] += 1
+        response = await client.get(f"/v8/finance/chart/{self.symbol}", params=params)
+        response.raise_for_status()
+        return parse_chart(response.json())
+
+    async def fetch_bars(self, start: float, interval: str) -> np.ndarray:
+        try:
+            return await self.fetch_chart(start, interval)
+        except Exception as e:
+            self._stats["failures"] += 1
+            if self.fallback is None:
+                raise
+            self._stats["fallbacks"] += 1
+            print(f"Chart fetch failed, falling back to {self.fallback.name}: {e}")
+            return await self.fallback.fetch_bars(start, interval)
+
+    async def fetch_market_cap(self) -> Optional[float]:
+        if self.fallback is None:
+            return None
+        return await self.fallback.fetch_market_cap()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.fallback is not None:
+            await self.fallback.close()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                # Yahoo rejects requests without a browser-like user agent
+                headers={"User-Agent": "Mozilla/5.0 (compatible; mara-allocation/1.0)"},
+            )
+        return self._client
+
+class YahooFinanceSource(MarketDataSource):
+    """Live bars from Yahoo Finance through one long-lived yfinance Ticker.
+
+    yfinance returns pandas DataFrames, so this is the only source that
+    imports pandas (lazily, on first use).
+    """
+
+    name = "yfinance"
+
+    def __init__(self, symbol: str = "BTC-USD", max_workers: int = 2):
+        self.symbol = symbol
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._ticker = None
+
+    @property
+    def ticker(self):
+        """Long-lived Ticker, created on first use and shared by every call"""
+        if self._ticker is None:
+            # Imported lazily: yfinance is only loaded when this source is actually used
+            import yfinance as yf
+            self._ticker = yf.Ticker(self.symbol)
+        return self._ticker
+
+    async def fetch_bars(self, start: float, interval: str) -> np.ndarray:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, lambda: self._history(start, interval))
+
+    async def fetch_market_cap(self) -> Optional[float]:
+        loop = asyncio.get_event_loop()
+        info = await loop.run_in_executor(self.executor, lambda: self.ticker.info)
+        return info.get("marketCap") if info else None
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    def _history(self, start: float, interval: str) -> np.ndarray:
+        import pandas as pd
+
+        frame = self.ticker.history(start=pd.Timestamp(start, unit="s", tz="UTC"), interval=interval)
+        records = np.empty(len(frame), dtype=BAR_DTYPE)
+        if len(frame) == 0:
+            return records
+        index = frame.index
+        index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+        records["timestamp"] = (index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        for column, name in CHART_FIELDS.items():
+            records[name] = frame[column].to_numpy(dtype=np.float64)
+        return records
+
+class CSVReplaySource(MarketDataSource):
+    """Replays OHLCV rows from a CSV as live bars on an accelerated clock.
+
+    Rows are served in file order, one per bar of whatever interval is
+    requested, looping when the file runs out. Bars are stamped on a virtual
+    clock that starts at ``start`` (default: now) and runs ``speed`` times
+    faster than real time, with ``history`` bars back-filled before it. Volume
+    is rescaled from the file's row spacing to the requested interval. The
+    sequence of bars is fully determined by the file, so runs are repeatable.
+    """
+
+    name = "csv"
+    # Replayed bars are restamped on every run
+    persistent = False
+
+    def __init__(
+        self,
+        rows: List[Dict[str, float]],
+        speed: float = 1.0,
+        history: int = 1440,
+        row_seconds: float = 86400.0,
+        market_cap: Optional[float] = None,
+        start: Optional[float] = None
+    ):
+        if not rows:
+            raise ValueError("Bar replay needs at least one CSV row")
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.rows = rows
+        self._table = np.array([[row[column] for column in BAR_COLUMNS] for row in rows], dtype=np.float64)
+        self.speed = speed
+        self.history = max(1, history)
+        self.row_seconds = row_seconds
+        self.market_cap = market_cap
+        self.start = float(start) if start is not None else time.time()
+        self._started_mono = time.monotonic()
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_REPLAY_CSV, **kwargs) -> "CSVReplaySource":
+        with open(path, newline="") as f:
+            raw = list(csv.DictReader(f))
+        rows = [{column: float(row[column]) for column in BAR_COLUMNS} for row in raw]
+        if len(raw) > 1 and "row_seconds" not in kwargs:
+            first, second = datetime.fromisoformat(raw[0]["Date"]), datetime.fromisoformat(raw[1]["Date"])
+            kwargs["row_seconds"] = (second - first).total_seconds()
+        return cls(rows, **kwargs)
+
+    def now(self) -> float:
+        """Current time on the replay clock (epoch seconds)"""
+        return self.start + (time.monotonic() - self._started_mono) * self.speed
+
+    def bars(self, start: float, interval: str) -> np.ndarray:
+        step = interval_seconds(interval)
+        anchor = self.start - self.start % step
+        current = int((self.now() - anchor) // step)
+        first = max(-(self.history - 1), int(-((anchor - start) // step)))
+
+        k = np.arange(first, current + 1)
+        table = self._table[(k + self.history - 1) % len(self._table)]
+        records = np.empty(len(k), dtype=BAR_DTYPE)
+        records["timestamp"] = anchor + k * step
+        for i, name in enumerate(CHART_FIELDS.values()):
+            records[name] = table[:, i]
+        records["volume"] *= step / self.row_seconds
+        return records
+
+    async def fetch_bars(self, start: float, interval: str) -> np.ndarray:
+        return self.bars(start, interval)
+
+    async def fetch_market_cap(self) -> Optional[float]:
+        return self.market_cap
+
+def source_from_env(symbol: str = "BTC-USD") -> MarketDataSource:
+    """Pick the market data backend from BTC_DATA_SOURCE ("yahoo", "yfinance" or "csv")"""
+    backend = os.getenv("BTC_DATA_SOURCE", "yahoo").lower()
+    if backend == "csv":
+        market_cap = os.getenv("BTC_REPLAY_MARKET_CAP")
+        return CSVReplaySource.from_csv(
+            os.getenv("BTC_REPLAY_CSV", DEFAULT_REPLAY_CSV),
+            speed=float(os.getenv("BTC_REPLAY_SPEED", "1")),
+            history=int(os.getenv("BTC_REPLAY_HISTORY", "1440")),
+            market_cap=float(market_cap) if market_cap else None,
+        )
+    if backend == "yahoo":
+        return YahooChartSource(
+            symbol,
+            base_url=os.getenv("BTC_CHART_URL", YAHOO_CHART_URL),
+            fallback=YahooFinanceSource(symbol),
+        )
+    if backend == "yfinance":
+        return YahooFinanceSource(symbol)
+    raise ValueError(f"Unknown BTC_DATA_SOURCE '{backend}'")
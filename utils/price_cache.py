@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Any, Optional
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a MARA timestamp; naive values are treated as UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an HTTP Date header, returning None if it is missing or malformed"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+class PriceCache:
+    """Caches the /prices payload until the next expected price tick.
+
+    MARA publishes a new price row every ``tick_interval`` seconds, so instead of
+    a fixed TTL the entry expires when the row after the latest ``timestamp`` is
+    due. The remaining time is measured against the upstream clock (the HTTP
+    ``Date`` header) to stay correct under local clock skew. When a tick is
+    overdue the entry is only kept for ``min_ttl`` seconds so the new row is
+    picked up promptly.
+    """
+
+    def __init__(self, tick_interval: float = 300.0, min_ttl: float = 5.0):
+        self.tick_interval = tick_interval
+        self.min_ttl = min_ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._prices: Optional[List[Dict[str, Any]]] = None
+        self._expires_at = 0.0
+        self._fetched_at: Optional[datetime] = None
+
+    def get(self) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached prices if still current, counting a hit or miss"""
+        if self._prices is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._prices
+        self.misses += 1
+        return None
+
+    def set(self, prices: List[Dict[str, Any]], server_time: Optional[datetime] = None) -> None:
+        """Store a fresh /prices payload and schedule expiry at the next tick"""
+        self._prices = prices
+        self._fetched_at = datetime.now(timezone.utc)
+        self._expires_at = time.monotonic() + self._seconds_until_next_tick(prices, server_time)
+
+    def peek(self) -> Optional[List[Dict[str, Any]]]:
+        """Return the last stored payload even if expired (for fallbacks); not counted"""
+        return self._prices
+
+    def invalidate(self) -> None:
+        """Expire the cached entry so the next read goes upstream (it is kept for fallbacks)"""
+        if self._expires_at:
+            self.invalidations += 1
+        self._expires_at = 0.0
+
+    @property
+    def fetched_at(self) -> Optional[datetime]:
+        return self._fetched_at
+
+    @property
+    def ttl_remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+            "ttl_remaining": self.ttl_remaining,
+            "fetched_at": self._fetched_at.isoformat() if self._fetched_at else None,
+        }
+
+    def _seconds_until_next_tick(
+        self,
+        prices: List[Dict[str, Any]],
+        server_time: Optional[datetime]
+    ) -> float:
+        try:
+            latest = parse_timestamp(prices[0]["timestamp"])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return self.min_ttl
+
+        now = server_time or datetime.now(timezone.utc)
+        next_tick = latest + timedelta(seconds=self.tick_interval)
+        remaining = (next_tick - now).total_seconds()
+
+        if remaining <= 0:
+            return self.min_ttl
+        return min(remaining, self.tick_interval)
@@ -0,0 +1,113 @@
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional
+
+from utils.price_cache import parse_timestamp
+
+PRICE_FIELDS = ("energy_price", "hash_price", "token_price")
+
+def to_epoch(timestamp: str) -> float:
+    return parse_timestamp(timestamp).timestamp()
+
+def from_epoch(seconds: float) -> str:
+    """Format epoch seconds the way MARA does (naive UTC ISO-8601)"""
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+class PriceHistory:
+    """Fixed-capacity ring buffer of MARA price ticks.
+
+    Ticks are stored column-wise in ``array('d')`` buffers (epoch seconds plus
+    energy, hash and token prices). Only ticks newer than the last stored one
+    are appended, so re-ingesting the full /prices payload is cheap, and the
+    i-th most recent tick is addressable in O(1).
+    """
+
+    def __init__(self, capacity: int = 4096):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._columns = {field: array("d", bytes(8 * capacity)) for field in PRICE_FIELDS}
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        if not self._size:
+            return None
+        return self._timestamps[self._index(0)]
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def append(self, timestamp: float, energy_price: float, hash_price: float, token_price: float) -> bool:
+        """Append one tick; ticks not newer than the latest stored one are ignored"""
+        last = self.last_timestamp
+        if last is not None and timestamp <= last:
+            return False
+
+        if self._size < self.capacity:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+
+        self._timestamps[slot] = timestamp
+        self._columns["energy_price"][slot] = energy_price
+        self._columns["hash_price"][slot] = hash_price
+        self._columns["token_price"][slot] = token_price
+        return True
+
+    def ingest(self, prices: Iterable[Dict[str, Any]]) -> int:
+        """Append the rows of a /prices payload that are newer than the last stored tick"""
+        last = self.last_timestamp
+        rows = []
+        for row in prices:
+            try:
+                ts = to_epoch(row["timestamp"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if last is None or ts > last:
+                rows.append((ts, row))
+
+        rows.sort(key=lambda item: item[0])
+        appended = 0
+        for ts, row in rows[-self.capacity:]:
+            appended += self.append(
+                ts,
+                float(row.get("energy_price", 0.0)),
+                float(row.get("hash_price", 0.0)),
+                float(row.get("token_price", 0.0)),
+            )
+        return appended
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """The i-th most recent tick (0 = latest) in /prices row format"""
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        slot = self._index(i)
+        return {
+            "energy_price": self._columns["energy_price"][slot],
+            "hash_price": self._columns["hash_price"][slot],
+            "timestamp": from_epoch(self._timestamps[slot]),
+            "token_price": self._columns["token_price"][slot],
+        }
+
+    def latest(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to n most recent ticks, newest first, in /prices row format"""
+        count = self._size if n is None else max(0, min(n, self._size))
+        return [self.row(i) for i in range(count)]
+
+    def window(self, field: str, n: Optional[int] = None) -> List[float]:
+        """Up to n most recent values of one price column, newest first"""
+        column = self._timestamps if field == "timestamp" else self._columns[field]
+        count = self._size if n is None else max(0, min(n, self._size))
+        return [column[self._index(i)] for i in range(count)]
+
+    def _index(self, i: int) -> int:
+        return (self._start + self._size - 1 - i) % self.capacity
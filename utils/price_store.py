@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from utils.price_history import PRICE_FIELDS, to_epoch, from_epoch
+
+class PriceStore:
+    """Durable, append-only SQLite store of MARA price ticks.
+
+    Ticks are keyed by epoch timestamp (a clustered primary key, so range
+    queries are index scans) and duplicates are ignored, which makes feeding
+    it the same /prices rows repeatedly harmless. Methods are blocking; async
+    callers should run them in a worker thread.
+
+    ``source`` names the upstream the ticks come from (its base URL). Ticks
+    recorded from a different source are dropped on open, so one upstream's
+    history can never shadow another's.
+    """
+
+    def __init__(self, path: str, source: Optional[str] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS price_ticks (
+                ts REAL PRIMARY KEY,
+                energy_price REAL NOT NULL,
+                hash_price REAL NOT NULL,
+                token_price REAL NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        self.source = source
+        if source is not None:
+            self._bind_source(source)
+
+    def append(self, prices: Iterable[Dict[str, Any]]) -> int:
+        """Insert /prices rows, skipping timestamps already stored; returns rows added"""
+        ticks = []
+        for row in prices:
+            try:
+                ticks.append((to_epoch(row["timestamp"]),) + tuple(float(row.get(f, 0.0)) for f in PRICE_FIELDS))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return self.bulk_load(ticks)
+
+    def bulk_load(self, ticks: Iterable[Tuple[float, float, float, float]]) -> int:
+        """Insert (ts, energy, hash, token) tuples in a single transaction"""
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO price_ticks VALUES (?, ?, ?, ?)", ticks
+                )
+            return self._conn.total_changes - before
+
+    def range(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Ticks with start <= ts <= end (epoch seconds), oldest first"""
+        query = "SELECT ts, energy_price, hash_price, token_price FROM price_ticks WHERE ts >= ? AND ts <= ? ORDER BY ts"
+        params: List[Any] = [start if start is not None else float("-inf"), end if end is not None else float("inf")]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_row(row) for row in rows]
+
+    def latest(self, n: int) -> List[Dict[str, Any]]:
+        """The n most recent ticks, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, energy_price, hash_price, token_price FROM price_ticks ORDER BY ts DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [self._to_row(row) for row in rows]
+
+    def last_timestamp(self) -> Optional[float]:
+        with self._lock:
+            return self._conn.execute("SELECT MAX(ts) FROM price_ticks").fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM price_ticks").fetchone()[0]
+
+    def truncate_after(self, timestamp: float) -> int:
+        """Drop ticks newer than `timestamp`; returns rows removed"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM price_ticks WHERE ts > ?", (timestamp,)).rowcount
+
+    def compact(self, before: Optional[float] = None) -> int:
+        """Drop ticks older than `before` (if given) and reclaim free pages"""
+        with self._lock:
+            removed = 0
+            if before is not None:
+                with self._conn:
+                    removed = self._conn.execute("DELETE FROM price_ticks WHERE ts < ?", (before,)).rowcount
+            self._conn.execute("VACUUM")
+            return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _bind_source(self, source: str) -> None:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM store_meta WHERE key = 'source'").fetchone()
+            if row is not None and row[0] == source:
+                return
+            if row is not None or self._conn.execute("SELECT 1 FROM price_ticks LIMIT 1").fetchone():
+                print(f"Price store {self.path} held ticks from {row[0] if row else 'an unknown source'}; discarding them")
+                self._conn.execute("DELETE FROM price_ticks")
+            self._conn.execute("INSERT OR REPLACE INTO store_meta VALUES ('source', ?)", (source,))
+
+    @staticmethod
+    def _to_row(row: Tuple[float, float, float, float]) -> Dict[str, Any]:
+        ts, energy_price, hash_price, token_price = row
+        return {
+            "energy_price": energy_price,
+            "hash_price": hash_price,
+            "timestamp": from_epoch(ts),
+            "token_price": token_price,
+        }
@@ -0,0 +1,126 @@
+import codecs
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional
+
+import httpx
+
+from utils.price_history import to_epoch
+
+class JSONArrayStreamDecoder:
+    """Incrementally decodes the elements of a top-level JSON array.
+
+    Text is fed in arbitrary chunks; each call returns the elements that became
+    complete. Consumed input is dropped, so memory stays bounded by the largest
+    single element rather than the whole document.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        items = []
+
+        while not self.done:
+            self._skip_whitespace()
+            if self._pos >= len(self._buffer):
+                break
+
+            if not self._started:
+                if self._buffer[self._pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                self._started = True
+                self._pos += 1
+                continue
+
+            char = self._buffer[self._pos]
+            if char == ",":
+                self._pos += 1
+                continue
+            if char == "]":
+                self.done = True
+                self._pos += 1
+                break
+
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                break  # Element is incomplete; wait for more input
+            if not isinstance(item, (dict, list, str)) and not self._delimited(end):
+                break  # A number or literal may continue in the next chunk
+            items.append(item)
+            self._pos = end
+
+        return items
+
+    def _delimited(self, end: int) -> bool:
+        while end < len(self._buffer) and self._buffer[end] in " \t\r\n":
+            end += 1
+        return end < len(self._buffer) and self._buffer[end] in ",]"
+
+    def _skip_whitespace(self) -> None:
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+            self._pos += 1
+
+@dataclass
+class PriceStreamResult:
+    rows: List[Dict[str, Any]]
+    date: Optional[str]
+    complete: bool
+    # Epoch of the first (newest) row with a parsable timestamp, even if it stopped the read
+    newest: Optional[float] = None
+
+async def read_price_stream(
+    response: httpx.Response,
+    max_rows: Optional[int] = None,
+    stop_after: Optional[float] = None,
+    drain_limit: int = 65536
+) -> PriceStreamResult:
+    """Decode /prices rows (newest first) from a streamed response.
+
+    Decoding stops after ``max_rows`` rows or at the first row whose timestamp
+    is not newer than ``stop_after`` (epoch seconds); rows without a parsable
+    timestamp are passed through and never stop the read. Up to
+    ``drain_limit`` further bytes are then read and discarded so the HTTP/1.1
+    connection can go back to the pool; a longer remainder is abandoned and
+    the connection is dropped when the response is closed.
+    """
+    decoder = JSONArrayStreamDecoder()
+    text = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+    rows: List[Dict[str, Any]] = []
+    stopped = False
+    drained = 0
+    newest: Optional[float] = None
+
+    async for chunk in response.aiter_bytes():
+        if stopped or decoder.done:
+            drained += len(chunk)
+            if drained > drain_limit:
+                break
+            continue
+        for row in decoder.feed(text.decode(chunk)):
+            if stop_after is not None or newest is None:
+                ts = _row_epoch(row)
+                if newest is None:
+                    newest = ts
+                if stop_after is not None and ts is not None and ts <= stop_after:
+                    stopped = True
+                    break
+            rows.append(row)
+            if max_rows is not None and len(rows) >= max_rows:
+                stopped = True
+                break
+
+    return PriceStreamResult(rows, response.headers.get("date"), complete=not stopped, newest=newest)
+
+def _row_epoch(row: Any) -> Optional[float]:
+    try:
+        return to_epoch(row["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Any, Deque, Optional
+
+class Lane(IntEnum):
+    """Request priority lanes; lower values are served first"""
+    DEPLOY = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+
+# Lane used by requests that do not pass one explicitly
+current_lane: ContextVar[Lane] = ContextVar("mara_request_lane", default=Lane.INTERACTIVE)
+
+class LaneTicket:
+    """The lane of a request shared by several callers (e.g. a single-flight read).
+
+    A caller joining with a higher priority promotes the ticket; if the
+    request is still queued for a token it moves to the new lane's queue.
+    """
+
+    def __init__(self, lane: Lane = Lane.INTERACTIVE):
+        self.lane = lane
+        self._limiter: Optional["PriorityRateLimiter"] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    def promote(self, lane: Lane) -> None:
+        if lane >= self.lane:
+            return
+        previous, self.lane = self.lane, lane
+        if self._limiter is not None and self._waiter is not None:
+            self._limiter._requeue(self._waiter, previous, lane)
+
+# Shared ticket of the request being made in this context, if any
+current_ticket: ContextVar[Optional[LaneTicket]] = ContextVar("mara_request_ticket", default=None)
+
+class PriorityRateLimiter:
+    """Token bucket whose waiters are served strictly by lane priority.
+
+    Requests take a token immediately when one is available and nobody of equal
+    or higher priority is queued. Otherwise they wait in their lane; whenever a
+    token is refilled it goes to the oldest waiter of the highest-priority
+    non-empty lane, so deploys never queue behind reads.
+    """
+
+    def __init__(self, rate: float = 20.0, burst: int = 40):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: Dict[Lane, Deque[asyncio.Future]] = {lane: deque() for lane in Lane}
+        self._pump_task: Optional[asyncio.Task] = None
+        self._stats = {
+            lane: {"acquired": 0, "queued": 0, "max_queue_depth": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for lane in Lane
+        }
+
+    async def acquire(self, lane: Lane = Lane.INTERACTIVE, ticket: Optional[LaneTicket] = None) -> float:
+        """Wait for a token in the given lane (or the ticket's, which may be promoted
+        while waiting); returns the time spent waiting"""
+        if ticket is not None:
+            lane = ticket.lane
+        self._refill()
+        if self._tokens >= 1 and not self._has_waiters(up_to=lane):
+            self._tokens -= 1
+            self._record(lane, 0.0)
+            return 0.0
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters[lane]
+        queue.append(waiter)
+        stats = self._stats[lane]
+        stats["queued"] += 1
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], len(queue))
+        self._ensure_pump()
+        if ticket is not None:
+            ticket._limiter, ticket._waiter = self, waiter
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            for pending in self._waiters.values():
+                if waiter in pending:
+                    pending.remove(waiter)
+                    break
+            else:
+                if waiter.done() and not waiter.cancelled():
+                    self._tokens += 1  # Token was granted after cancellation; give it back
+            raise
+        finally:
+            if ticket is not None:
+                ticket._limiter = ticket._waiter = None
+                lane = ticket.lane
+
+        waited = time.monotonic() - started
+        self._record(lane, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        lanes = {}
+        for lane in Lane:
+            stats = self._stats[lane]
+            lanes[lane.name.lower()] = {
+                **stats,
+                "queue_depth": len(self._waiters[lane]),
+                "avg_wait": stats["total_wait"] / stats["acquired"] if stats["acquired"] else 0.0,
+            }
+        return {"rate": self.rate, "burst": self.burst, "tokens": self._tokens, "lanes": lanes}
+
+    def _record(self, lane: Lane, waited: float) -> None:
+        stats = self._stats[lane]
+        stats["acquired"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _requeue(self, waiter: asyncio.Future, previous: Lane, lane: Lane) -> None:
+        queue = self._waiters[previous]
+        if waiter in queue:
+            queue.remove(waiter)
+            self._waiters[lane].append(waiter)
+
+    def _has_waiters(self, up_to: Lane) -> bool:
+        return any(self._waiters[lane] for lane in Lane if lane <= up_to)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for lane in Lane:
+            queue = self._waiters[lane]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    return waiter
+        return None
+
+    def _ensure_pump(self) -> None:
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self) -> None:
+        while self._has_waiters(up_to=Lane.BACKGROUND):
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self._tokens -= 1
+            waiter.set_result(None)
@@ -0,0 +1,238 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open"""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint}; retry in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """True for errors that indicate an unhealthy upstream rather than a bad request"""
+    if isinstance(error, (CircuitOpenError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return False
+
+@dataclass
+class ResilienceConfig:
+    """Timeouts, retry, hedging and breaker settings for upstream calls"""
+    timeouts: Dict[str, float] = field(default_factory=lambda: {
+        "GET /prices": 10.0,
+        "GET /inventory": 10.0,
+        "GET /machines": 10.0,
+        "PUT /machines": 20.0,
+    })
+    default_timeout: float = 10.0
+    max_retries: int = 2
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+    hedge_percentile: float = 95.0
+    hedge_min_delay: float = 0.25
+    hedge_min_samples: int = 20
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+class CircuitBreaker:
+    """Classic closed / open / half-open breaker counting consecutive failures"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        # Half-open: let a single probe through
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Release a half-open probe slot without judging upstream health"""
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in": self.retry_in(),
+        }
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+class Resilience:
+    """Per-endpoint timeouts, hedged reads, retries and circuit breakers.
+
+    Idempotent calls are hedged (a duplicate is started once the primary has
+    been outstanding longer than the endpoint's latency percentile) and retried
+    with jittered exponential backoff on upstream failures. Every call goes
+    through the endpoint's breaker, which fails fast while the upstream is
+    unhealthy so callers can fall back to cached data.
+    """
+
+    def __init__(self, config: Optional[ResilienceConfig] = None):
+        self.config = config or ResilienceConfig()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def timeout_for(self, endpoint: str) -> float:
+        return self.config.timeouts.get(endpoint, self.config.default_timeout)
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(self.config.failure_threshold, self.config.reset_timeout)
+        return self._breakers[endpoint]
+
+    async def call(self, endpoint: str, fn: Callable[[], Awaitable[T]], idempotent: bool = True) -> T:
+        breaker = self.breaker(endpoint)
+        stats = self._stats.setdefault(endpoint, {"calls": 0, "retries": 0, "hedges": 0, "rejected": 0, "failures": 0})
+        stats["calls"] += 1
+        if not breaker.allow():
+            stats["rejected"] += 1
+            raise CircuitOpenError(endpoint, breaker.retry_in())
+
+        attempts = self.config.max_retries + 1 if idempotent else 1
+        try:
+            for attempt in range(attempts):
+                try:
+                    if idempotent:
+                        result = await self._hedged(endpoint, fn, stats)
+                    else:
+                        result = await self._timed(endpoint, fn)
+                except Exception as e:
+                    if not is_upstream_failure(e):
+                        breaker.release()
+                        raise
+                    if attempt == attempts - 1:
+                        stats["failures"] += 1
+                        breaker.record_failure()
+                        raise
+                    stats["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                else:
+                    breaker.record_success()
+                    return result
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+
+    def state(self) -> Dict[str, Any]:
+        endpoints = set(self._breakers) | set(self._stats)
+        return {
+            endpoint: {
+                "breaker": self.breaker(endpoint).snapshot(),
+                "latency_p50": self._tracker(endpoint).percentile(50),
+                "latency_p95": self._tracker(endpoint).percentile(95),
+                **self._stats.get(endpoint, {}),
+            }
+            for endpoint in sorted(endpoints)
+        }
+
+    def _tracker(self, endpoint: str) -> LatencyTracker:
+        if endpoint not in self._latency:
+            self._latency[endpoint] = LatencyTracker()
+        return self._latency[endpoint]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _hedge_delay(self, endpoint: str) -> Optional[float]:
+        tracker = self._tracker(endpoint)
+        if len(tracker) < self.config.hedge_min_samples:
+            return None
+        return max(self.config.hedge_min_delay, tracker.percentile(self.config.hedge_percentile))
+
+    async def _timed(self, endpoint: str, fn: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await fn()
+        self._tracker(endpoint).record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, endpoint: str, fn: Callable[[], Awaitable[T]], stats: Dict[str, int]) -> T:
+        delay = self._hedge_delay(endpoint)
+        if delay is None:
+            return await self._timed(endpoint, fn)
+
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(fn())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                stats["hedges"] += 1
+                pending.add(asyncio.ensure_future(fn()))
+
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        self._tracker(endpoint).record(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,132 @@
+from collections import deque
+from typing import Dict, Any, Deque, NamedTuple, Optional
+
+class Bar(NamedTuple):
+    timestamp: float
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+class RollingOHLCV:
+    """Rolling-window OHLCV statistics updated in O(1) amortized per bar.
+
+    Highs and lows are tracked with monotonic deques (the window max/min is
+    always at the front), and volume and price*volume are kept as running
+    sums, so high, low, volume and VWAP never require a scan of the window.
+    Bars must arrive in time order. A bar with the same timestamp as the
+    newest one replaces it, since the newest bar may still be forming; that
+    bar is held outside the deques until a newer one arrives so replacing it
+    never loses a max/min candidate.
+    """
+
+    def __init__(self, window: float = 86400.0):
+        self.window = window
+        self._bars: Deque[Bar] = deque()
+        self._highs: Deque[Bar] = deque()
+        self._lows: Deque[Bar] = deque()
+        self._newest: Optional[Bar] = None
+        self._volume = 0.0
+        self._notional = 0.0
+
+    def __len__(self) -> int:
+        return len(self._bars) + (self._newest is not None)
+
+    def update(
+        self,
+        timestamp: float,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float
+    ) -> bool:
+        """Add (or replace the newest) bar; returns False for out-of-order bars"""
+        newest = self._newest
+        if newest is not None:
+            if timestamp < newest.timestamp:
+                return False
+            self._remove_sums(newest)
+            if timestamp > newest.timestamp:
+                self._commit(newest)
+
+        bar = Bar(timestamp, open, high, low, close, volume)
+        self._newest = bar
+        self._add_sums(bar)
+        self._expire(timestamp - self.window)
+        return True
+
+    @property
+    def high(self) -> Optional[float]:
+        if self._newest is None:
+            return None
+        return max(self._highs[0].high, self._newest.high) if self._highs else self._newest.high
+
+    @property
+    def low(self) -> Optional[float]:
+        if self._newest is None:
+            return None
+        return min(self._lows[0].low, self._newest.low) if self._lows else self._newest.low
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @property
+    def vwap(self) -> Optional[float]:
+        return self._notional / self._volume if self._volume > 0 else None
+
+    @property
+    def last(self) -> Optional[Bar]:
+        return self._newest
+
+    def stats(self) -> Dict[str, Any]:
+        if self._newest is None:
+            return {"bars": 0}
+        first = self._bars[0] if self._bars else self._newest
+        return {
+            "bars": len(self),
+            "start": first.timestamp,
+            "end": self._newest.timestamp,
+            "open": first.open,
+            "close": self._newest.close,
+            "high": self.high,
+            "low": self.low,
+            "volume": self._volume,
+            "vwap": self.vwap,
+        }
+
+    def _commit(self, bar: Bar) -> None:
+        self._bars.append(bar)
+        self._add_sums(bar)
+        while self._highs and self._highs[-1].high <= bar.high:
+            self._highs.pop()
+        self._highs.append(bar)
+        while self._lows and self._lows[-1].low >= bar.low:
+            self._lows.pop()
+        self._lows.append(bar)
+
+    def _expire(self, cutoff: float) -> None:
+        while self._bars and self._bars[0].timestamp <= cutoff:
+            self._remove_sums(self._bars.popleft())
+        while self._highs and self._highs[0].timestamp <= cutoff:
+            self._highs.popleft()
+        while self._lows and self._lows[0].timestamp <= cutoff:
+            self._lows.popleft()
+        if not self._bars:
+            # Reset accumulated rounding error whenever the window restarts
+            self._volume = self._newest.volume if self._newest else 0.0
+            self._notional = self._typical(self._newest) * self._newest.volume if self._newest else 0.0
+
+    def _add_sums(self, bar: Bar) -> None:
+        self._volume += bar.volume
+        self._notional += self._typical(bar) * bar.volume
+
+    def _remove_sums(self, bar: Bar) -> None:
+        self._volume -= bar.volume
+        self._notional -= self._typical(bar) * bar.volume
+
+    @staticmethod
+    def _typical(bar: Bar) -> float:
+        return (bar.high + bar.low + bar.close) / 3.0
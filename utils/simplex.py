@@ -0,0 +1,96 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+EPSILON = 1e-9
+
+def solve_lp(c: np.ndarray, A: np.ndarray, b: np.ndarray) -> Optional[Tuple[np.ndarray, float]]:
+    """Maximize ``c @ y`` subject to ``A @ y <= b`` and ``y >= 0``.
+
+    A dense two-phase tableau simplex with Bland's rule, meant for the tiny
+    relaxations solved inside branch-and-bound (a handful of variables and
+    rows). Returns ``(y, value)``, or None if the problem is infeasible.
+    Unbounded problems raise ValueError; callers bound every variable.
+    """
+    m, n = A.shape
+    negative = b < 0
+    k = int(negative.sum())
+    width = n + m + k + 1
+
+    # Rows with a negative right-hand side are negated into >= rows with a
+    # surplus and an artificial variable; the rest start with their slack basic.
+    tableau = np.zeros((m + 1, width))
+    basis = np.empty(m, dtype=int)
+    artificial = n + m
+    for i in range(m):
+        sign = -1.0 if negative[i] else 1.0
+        tableau[i, :n] = sign * A[i]
+        tableau[i, n + i] = sign
+        tableau[i, -1] = sign * b[i]
+        if negative[i]:
+            tableau[i, artificial] = 1.0
+            basis[i] = artificial
+            artificial += 1
+        else:
+            basis[i] = n + i
+
+    if k:
+        # Phase 1: minimize the sum of artificials (maximize its negation)
+        tableau[-1, n + m:n + m + k] = 1.0
+        for i in np.flatnonzero(negative):
+            tableau[-1] -= tableau[i]
+        _iterate(tableau, basis, width - 1)
+        if tableau[-1, -1] < -1e-7:
+            return None
+        tableau, basis = _drop_artificials(tableau, basis, n + m)
+
+    tableau[-1] = 0.0
+    tableau[-1, :n] = -c
+    for i, j in enumerate(basis):
+        if tableau[-1, j] != 0.0:
+            tableau[-1] -= tableau[-1, j] * tableau[i]
+    _iterate(tableau, basis, n + m)
+
+    y = np.zeros(n)
+    for i, j in enumerate(basis):
+        if j < n:
+            y[j] = tableau[i, -1]
+    return y, float(c @ y)
+
+def _iterate(tableau: np.ndarray, basis: np.ndarray, columns: int) -> None:
+    """Pivot until no reduced cost among the first ``columns`` columns is negative"""
+    while True:
+        candidates = np.flatnonzero(tableau[-1, :columns] < -EPSILON)
+        if not len(candidates):
+            return
+        entering = candidates[0]
+        column = tableau[:-1, entering]
+        rows = np.flatnonzero(column > EPSILON)
+        if not len(rows):
+            raise ValueError("Linear program is unbounded")
+        ratios = tableau[rows, -1] / column[rows]
+        best = ratios.min()
+        ties = rows[ratios <= best + EPSILON]
+        leaving = ties[np.argmin(basis[ties])]
+        _pivot(tableau, basis, leaving, entering)
+
+def _pivot(tableau: np.ndarray, basis: np.ndarray, row: int, column: int) -> None:
+    tableau[row] /= tableau[row, column]
+    factors = tableau[:, column].copy()
+    factors[row] = 0.0
+    tableau -= np.outer(factors, tableau[row])
+    basis[row] = column
+
+def _drop_artificials(tableau: np.ndarray, basis: np.ndarray, first_artificial: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pivot artificials (at zero) out of the basis, drop redundant rows and artificial columns"""
+    keep = []
+    for i in range(len(basis)):
+        if basis[i] >= first_artificial:
+            nonzero = np.flatnonzero(np.abs(tableau[i, :first_artificial]) > EPSILON)
+            if not len(nonzero):
+                continue  # Redundant row
+            _pivot(tableau, basis, i, nonzero[0])
+        keep.append(i)
+    rows = keep + [tableau.shape[0] - 1]
+    columns = list(range(first_artificial)) + [tableau.shape[1] - 1]
+    return tableau[np.ix_(rows, columns)], basis[keep]
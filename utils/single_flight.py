@@ -0,0 +1,52 @@
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight request.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive its result (or exception).
+    The work runs as its own task, so a cancelled caller does not cancel it
+    for everyone else.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        stats = self._stats.setdefault(key, {"calls": 0, "executions": 0, "coalesced": 0})
+        stats["calls"] += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(task)
+
+    def forget(self, key: str) -> None:
+        """Detach the in-flight call for a key so the next caller starts a fresh one.
+
+        Callers already waiting on the old call still receive its result.
+        """
+        self._inflight.pop(key, None)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def stats(self) -> Dict[str, Any]:
+        return {key: dict(values) for key, values in self._stats.items()}
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
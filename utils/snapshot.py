@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
+
+SNAPSHOT_PARTS = ("prices", "inventory", "site_status")
+
+@dataclass(frozen=True)
+class SnapshotPart:
+    """One part of a MaraSnapshot together with its freshness metadata"""
+    name: str
+    value: Any = None
+    fetched_at: Optional[str] = None
+    age: Optional[float] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def freshness(self) -> Dict[str, Any]:
+        return {
+            "fetched_at": self.fetched_at,
+            "age_seconds": self.age,
+            "error": str(self.error) if self.error else None,
+        }
+
+@dataclass(frozen=True)
+class MaraSnapshot:
+    """Immutable, point-in-time view of prices, inventory and site status.
+
+    Parts that were not requested are absent; parts that failed or timed out
+    carry their exception, which is re-raised when the value is accessed.
+    """
+    taken_at: str
+    parts: Mapping[str, SnapshotPart]
+
+    def __post_init__(self):
+        object.__setattr__(self, "parts", MappingProxyType(dict(self.parts)))
+
+    def part(self, name: str) -> SnapshotPart:
+        if name not in self.parts:
+            raise KeyError(f"Snapshot part '{name}' was not requested")
+        return self.parts[name]
+
+    def value(self, name: str) -> Any:
+        part = self.part(name)
+        if part.error is not None:
+            raise part.error
+        return part.value
+
+    @property
+    def prices(self):
+        return self.value("prices")
+
+    @property
+    def inventory(self) -> Dict[str, Any]:
+        return self.value("inventory")
+
+    @property
+    def site_status(self) -> Dict[str, Any]:
+        return self.value("site_status")
+
+    def freshness(self) -> Dict[str, Any]:
+        return {name: part.freshness() for name, part in self.parts.items()}
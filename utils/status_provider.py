@@ -0,0 +1,138 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+@dataclass(frozen=True)
+class StatusReading:
+    """A site status value tagged with how old it is"""
+    value: Dict[str, Any]
+    fetched_at: datetime
+    age: float
+    stale: bool
+
+class SiteStatusProvider:
+    """Stale-while-revalidate wrapper around the /machines read.
+
+    Values younger than ``soft_ttl`` are served as-is. Between ``soft_ttl`` and
+    ``hard_ttl`` the last good value is served immediately while a single
+    background refresh runs. Only when there is no value, or it is older than
+    ``hard_ttl``, does the caller wait on the upstream. A failed background
+    refresh keeps the last good value, as does a blocking refresh whose error
+    matches ``fallback_on``.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        soft_ttl: float = 15.0,
+        hard_ttl: float = 120.0,
+        fallback_on: Optional[Callable[[BaseException], bool]] = None,
+        background_fetch: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+    ):
+        if hard_ttl < soft_ttl:
+            raise ValueError("hard_ttl must be >= soft_ttl")
+        self._fetch = fetch
+        self._background_fetch = background_fetch or fetch
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.fallback_on = fallback_on
+        self._value: Optional[Dict[str, Any]] = None
+        self._fetched_at: Optional[datetime] = None
+        self._fetched_mono = 0.0
+        self._expired = True
+        self._generation = 0
+        self._value_generation = -1
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "fresh": 0,
+            "stale": 0,
+            "blocking_refreshes": 0,
+            "background_refreshes": 0,
+            "background_failures": 0,
+            "fallbacks": 0,
+        }
+
+    async def get(self) -> StatusReading:
+        age = self._age()
+        if self._value is None or self._expired or age >= self.hard_ttl:
+            self._stats["blocking_refreshes"] += 1
+            try:
+                await self._refresh()
+            except Exception as e:
+                # Serve the last good value rather than failing while the upstream is down
+                if self._value is None or self.fallback_on is None or not self.fallback_on(e):
+                    raise
+                self._stats["fallbacks"] += 1
+                print(f"Serving cached site status, upstream unavailable: {e}")
+        elif age >= self.soft_ttl:
+            self._stats["stale"] += 1
+            self._schedule_refresh()
+        else:
+            self._stats["fresh"] += 1
+        return self.reading()
+
+    def reading(self) -> StatusReading:
+        if self._value is None:
+            raise LookupError("No site status has been fetched yet")
+        age = self._age()
+        return StatusReading(
+            value=self._value,
+            fetched_at=self._fetched_at,
+            age=age,
+            stale=age >= self.soft_ttl,
+        )
+
+    def invalidate(self) -> None:
+        """Force the next read to wait for a fresh value (e.g. after a deploy).
+
+        The fetch must not hand a read that started before this call to reads
+        made after it (MaraClient detaches its in-flight /machines call).
+        """
+        self._generation += 1
+        self._expired = True
+
+    async def close(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "age": self._age() if self._value is not None else None,
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+        }
+
+    async def _refresh(self, fetch: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None) -> None:
+        generation = self._generation
+        value = await (fetch or self._fetch)()
+        if generation < self._value_generation:
+            return  # A read started after a later invalidation already landed
+        self._value = value
+        self._value_generation = generation
+        self._fetched_at = datetime.now(timezone.utc)
+        self._fetched_mono = time.monotonic()
+        # A fetch that started before an invalidation may predate the change
+        self._expired = generation != self._generation
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.ensure_future(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        self._stats["background_refreshes"] += 1
+        try:
+            await self._refresh(self._background_fetch)
+        except Exception as e:
+            self._stats["background_failures"] += 1
+            print(f"Error refreshing site status: {e}")
+
+    def _age(self) -> float:
+        return time.monotonic() - self._fetched_mono if self._value is not None else float("inf")